@@ -24,7 +24,7 @@ import {
 } from "lucide-react"
 import { AdminProtectedRoute } from "@/components/admin-protected-route"
 import { Navbar } from "@/components/navbar"
-import { issuesApi } from "@/lib/api"
+import { adminApi, issuesApi } from "@/lib/api"
 
 const categories = [
   "Road",
@@ -44,8 +44,13 @@ export default function AdminDashboardPage() {
   const [reports, setReports] = useState<any[]>([])
   const [filteredReports, setFilteredReports] = useState<any[]>([])
   const [isLoading, setIsLoading] = useState(true)
+  // Cursor of the next page of reports; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [error, setError] = useState("")
   const [success, setSuccess] = useState("")
+  // Dashboard counters from /admin/stats; cover every report, not just the loaded page
+  const [counters, setCounters] = useState<Awaited<ReturnType<typeof adminApi.getStats>> | null>(null)
 
   // Filters
   const [statusFilter, setStatusFilter] = useState("all")
@@ -58,6 +63,7 @@ export default function AdminDashboardPage() {
 
   useEffect(() => {
     fetchReports()
+    fetchStats()
   }, [])
 
   useEffect(() => {
@@ -69,6 +75,7 @@ export default function AdminDashboardPage() {
       setIsLoading(true)
       const response = await issuesApi.getAdminReports()
       setReports(response.issues)
+      setNextCursor(response.next_cursor)
     } catch (err) {
       setError("Failed to fetch reports")
       console.error(err)
@@ -77,6 +84,29 @@ export default function AdminDashboardPage() {
     }
   }
 
+  const loadMoreReports = async () => {
+    if (!nextCursor) return
+    try {
+      setIsLoadingMore(true)
+      const response = await issuesApi.getAdminReports({ cursor: nextCursor })
+      setReports((prev) => [...prev, ...response.issues])
+      setNextCursor(response.next_cursor)
+    } catch (err) {
+      setError("Failed to fetch reports")
+      console.error(err)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
+  const fetchStats = async () => {
+    try {
+      setCounters(await adminApi.getStats())
+    } catch (err) {
+      console.error(err)
+    }
+  }
+
   const applyFilters = () => {
     let filtered = reports
 
@@ -117,6 +147,7 @@ export default function AdminDashboardPage() {
           report._id === issueId ? { ...report, status: newStatus, updated_at: new Date().toISOString() } : report,
         ),
       )
+      fetchStats()
 
       setSuccess(`Issue status updated to ${newStatus}`)
       setTimeout(() => setSuccess(""), 3000)
@@ -128,20 +159,20 @@ export default function AdminDashboardPage() {
     }
   }
 
-  const getStats = () => {
-    const total = reports.length
-    const pending = reports.filter((r: any) => r.status === "Pending").length
-    const inProgress = reports.filter((r: any) => r.status === "In Progress").length
-    const resolved = reports.filter((r: any) => r.status === "Resolved").length
+  const statusCount = (status: string) => counters?.by_status[status] ?? 0
 
-    return { total, pending, inProgress, resolved }
-  }
+  const getStats = () => ({
+    total: counters?.total ?? 0,
+    pending: statusCount("Pending"),
+    inProgress: statusCount("In Progress"),
+    resolved: statusCount("Resolved"),
+  })
 
   const getCategoryStats = () => {
     const categoryCount = categories
       .map((category) => ({
         name: category,
-        count: reports.filter((r: any) => r.category === category).length,
+        count: counters?.by_category[category]?.total ?? 0,
       }))
       .filter((item) => item.count > 0)
 
@@ -152,17 +183,17 @@ export default function AdminDashboardPage() {
     [
       {
         name: "Pending",
-        value: reports.filter((r: any) => r.status === "Pending").length,
+        value: statusCount("Pending"),
         color: statusColors.Pending,
       },
       {
         name: "In Progress",
-        value: reports.filter((r: any) => r.status === "In Progress").length,
+        value: statusCount("In Progress"),
         color: statusColors["In Progress"],
       },
       {
         name: "Resolved",
-        value: reports.filter((r: any) => r.status === "Resolved").length,
+        value: statusCount("Resolved"),
         color: statusColors.Resolved,
       },
     ].filter((item) => item.value > 0)
@@ -458,6 +489,14 @@ export default function AdminDashboardPage() {
                       </p>
                     </div>
                   )}
+
+                  {nextCursor && (
+                    <div className="text-center pt-4">
+                      <Button variant="outline" onClick={loadMoreReports} disabled={isLoadingMore}>
+                        {isLoadingMore ? "Loading..." : "Load more reports"}
+                      </Button>
+                    </div>
+                  )}
                 </CardContent>
               </Card>
             </TabsContent>
@@ -23,38 +23,38 @@ export default function DashboardPage() {
 
   const fetchDashboardData = async () => {
     try {
-      const allIssuesRes = await issuesApi.getAllIssues()
-      const allIssues = allIssuesRes.issues
+      // Totals come from the counters, not from downloading every issue
+      const count = (stats: { by_status: Record<string, number> }, status: string) => stats.by_status[status] ?? 0
 
       if (user?.role === "admin") {
         // Admin sees all system stats
+        const allStats = await issuesApi.getIssueStats()
         setStats({
           myReports: 0, // Not applicable for admin
-          totalIssues: allIssues.length,
-          resolvedIssues: allIssues.filter((issue) => issue.status === "Resolved").length,
-          pendingIssues: allIssues.filter((issue) => issue.status === "Pending").length,
+          totalIssues: allStats.total,
+          resolvedIssues: count(allStats, "Resolved"),
+          pendingIssues: count(allStats, "Pending"),
         })
         setRecentReports([]) // No recent reports for admin
       } else if (user?.role === "staff") {
         // Staff sees category-specific stats - NO My Reports or Recent Reports
-        const categoryIssues = allIssues.filter((issue) => issue.category === user.category)
+        const categoryStats = await issuesApi.getIssueStats({ category: user.category })
         setStats({
           myReports: 0, // Not applicable for staff
-          totalIssues: categoryIssues.length,
-          resolvedIssues: categoryIssues.filter((issue) => issue.status === "Resolved").length,
-          pendingIssues: categoryIssues.filter((issue) => issue.status === "Pending").length,
+          totalIssues: categoryStats.total,
+          resolvedIssues: count(categoryStats, "Resolved"),
+          pendingIssues: count(categoryStats, "Pending"),
         })
         setRecentReports([]) // No recent reports for staff
       } else {
         // Regular users see their own stats
-        const myReportsRes = await issuesApi.getMyReports()
-        const myReports = myReportsRes.issues
+        const [allStats, myReports] = await Promise.all([issuesApi.getIssueStats(), issuesApi.getAllMyReports()])
 
         setStats({
           myReports: myReports.length,
-          totalIssues: allIssues.length,
-          resolvedIssues: allIssues.filter((issue) => issue.status === "Resolved").length,
-          pendingIssues: allIssues.filter((issue) => issue.status === "Pending").length,
+          totalIssues: allStats.total,
+          resolvedIssues: count(allStats, "Resolved"),
+          pendingIssues: count(allStats, "Pending"),
         })
         setRecentReports(myReports.slice(0, 5))
       }
@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
+import { Button } from "@/components/ui/button"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 import { Users, Filter, AlertTriangle } from "lucide-react"
 import { ProtectedRoute } from "@/components/protected-route"
@@ -15,6 +16,9 @@ export default function IssuesPage() {
   const [statusFilter, setStatusFilter] = useState("all")
   const [categoryFilter, setCategoryFilter] = useState("all")
   const [isLoading, setIsLoading] = useState(true)
+  // Cursor of the next page of issues; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
 
   const categories = [
     "Road Issues",
@@ -34,6 +38,7 @@ export default function IssuesPage() {
         const response = await issuesApi.getAllIssues()
         setIssues(response.issues)
         setFilteredIssues(response.issues)
+        setNextCursor(response.next_cursor)
       } catch (error) {
         console.error("Failed to fetch issues:", error)
       } finally {
@@ -58,6 +63,20 @@ export default function IssuesPage() {
     setFilteredIssues(filtered)
   }, [issues, statusFilter, categoryFilter])
 
+  const loadMoreIssues = async () => {
+    if (!nextCursor) return
+    try {
+      setIsLoadingMore(true)
+      const response = await issuesApi.getAllIssues({ cursor: nextCursor })
+      setIssues((prev) => [...prev, ...response.issues])
+      setNextCursor(response.next_cursor)
+    } catch (error) {
+      console.error("Failed to fetch issues:", error)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   // Group issues by category
   const groupedIssues = filteredIssues.reduce((acc: any, issue: any) => {
     if (!acc[issue.category]) {
@@ -173,6 +192,14 @@ export default function IssuesPage() {
               </CardContent>
             </Card>
           )}
+
+          {nextCursor && (
+            <div className="text-center mt-8">
+              <Button variant="outline" onClick={loadMoreIssues} disabled={isLoadingMore}>
+                {isLoadingMore ? "Loading..." : "Load more issues"}
+              </Button>
+            </div>
+          )}
         </main>
       </div>
     </ProtectedRoute>
@@ -33,9 +33,10 @@ export default function MyReportsPage() {
   useEffect(() => {
     const fetchReports = async () => {
       try {
-        const response = await issuesApi.getMyReports()
-        setReports(response.issues)
-        setFilteredReports(response.issues)
+        // Follows next_cursor through every page of the user's own reports
+        const issues = await issuesApi.getAllMyReports()
+        setReports(issues)
+        setFilteredReports(issues)
       } catch (error) {
         console.error("Failed to fetch reports:", error)
       } finally {
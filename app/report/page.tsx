@@ -14,7 +14,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { MapPin, Camera, AlertCircle, CheckCircle, Loader2, X } from "lucide-react"
 import { ProtectedRoute } from "@/components/protected-route"
 import { Navbar } from "@/components/navbar"
-import { issuesApi } from "@/lib/api"
+import { issuesApi, uploadImageResumable } from "@/lib/api"
 
 const categories = [
   { value: "Road", label: "Road Issues" },
@@ -147,7 +147,8 @@ export default function ReportPage() {
       }
 
       if (image) {
-        submitData.append("image", image)
+        // Chunked and resumable, so a dropped connection does not resend the whole photo
+        submitData.append("upload_id", await uploadImageResumable(image))
       }
 
       await issuesApi.submitReport(submitData)
@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { Card, CardContent } from "@/components/ui/card"
+import { Button } from "@/components/ui/button"
 import { CheckCircle } from "lucide-react"
 import { ProtectedRoute } from "@/components/protected-route"
 import { Navbar } from "@/components/navbar"
@@ -11,12 +12,21 @@ import { issuesApi } from "@/lib/api"
 export default function SolvedIssuesPage() {
   const [solvedIssues, setSolvedIssues] = useState<any[]>([])
   const [isLoading, setIsLoading] = useState(true)
+  // Total from the counters; the list itself is loaded a page at a time
+  const [resolvedCount, setResolvedCount] = useState(0)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
 
   useEffect(() => {
     const fetchSolvedIssues = async () => {
       try {
-        const response = await issuesApi.getAllIssues({ status: "Resolved" })
+        const [response, stats] = await Promise.all([
+          issuesApi.getAllIssues({ status: "Resolved" }),
+          issuesApi.getIssueStats(),
+        ])
         setSolvedIssues(response.issues)
+        setNextCursor(response.next_cursor)
+        setResolvedCount(stats.by_status["Resolved"] ?? response.issues.length)
       } catch (error) {
         console.error("Failed to fetch solved issues:", error)
       } finally {
@@ -27,6 +37,20 @@ export default function SolvedIssuesPage() {
     fetchSolvedIssues()
   }, [])
 
+  const loadMoreSolvedIssues = async () => {
+    if (!nextCursor) return
+    try {
+      setIsLoadingMore(true)
+      const response = await issuesApi.getAllIssues({ status: "Resolved", cursor: nextCursor })
+      setSolvedIssues((prev) => [...prev, ...response.issues])
+      setNextCursor(response.next_cursor)
+    } catch (error) {
+      console.error("Failed to fetch solved issues:", error)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   if (isLoading) {
     return (
       <ProtectedRoute>
@@ -67,7 +91,7 @@ export default function SolvedIssuesPage() {
                 <Card>
                   <CardContent className="p-6">
                     <div className="text-center">
-                      <div className="text-3xl font-bold text-green-600 mb-2">{solvedIssues.length}</div>
+                      <div className="text-3xl font-bold text-green-600 mb-2">{resolvedCount}</div>
                       <div className="text-gray-600">Issues Successfully Resolved</div>
                     </div>
                   </CardContent>
@@ -79,6 +103,14 @@ export default function SolvedIssuesPage() {
                   <ReportCard key={issue._id} report={issue} showUserName={true} />
                 ))}
               </div>
+
+              {nextCursor && (
+                <div className="text-center mt-8">
+                  <Button variant="outline" onClick={loadMoreSolvedIssues} disabled={isLoadingMore}>
+                    {isLoadingMore ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </>
           ) : (
             <Card>
@@ -27,6 +27,7 @@ import { StaffProtectedRoute } from "@/components/staff-protected-route"
 import { useStaffAuth } from "@/contexts/staff-auth-context"
 import { useStaffSocket } from "@/contexts/staff-socket-context"
 import Link from "next/link"
+import { staffApi } from "@/lib/api"
 
 const statusColors = {
   Pending: "#f59e0b",
@@ -46,33 +47,57 @@ export default function StaffDashboardPage() {
   const [error, setError] = useState("")
   const [success, setSuccess] = useState("")
   const [updatingStatus, setUpdatingStatus] = useState<string | null>(null)
+  // Cursor of the next page of reports; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
+  // Category counters from /staff/stats; cover every report, not just the loaded page
+  const [counters, setCounters] = useState<Awaited<ReturnType<typeof staffApi.getStats>> | null>(null)
 
   const { user, logout } = useStaffAuth()
   const { socket, isConnected } = useStaffSocket()
 
-  // Load staff reports (filtered by category)
-  const loadReports = async () => {
+  const loadStats = async () => {
     try {
-      setIsLoading(true)
-      setError("")
+      setCounters(await staffApi.getStats())
+    } catch (err) {
+      console.error(err)
+    }
+  }
 
-      const token = localStorage.getItem("token_staff")
-      if (!token) {
-        throw new Error("No authentication token found")
-      }
+  // Fetch one page of staff reports (filtered by category)
+  const fetchReportsPage = async (cursor?: string) => {
+    const token = localStorage.getItem("token_staff")
+    if (!token) {
+      throw new Error("No authentication token found")
+    }
 
-      const response = await fetch("http://localhost:5000/staff/reports", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      })
+    const url = new URL("http://localhost:5000/staff/reports")
+    if (cursor) {
+      url.searchParams.set("cursor", cursor)
+    }
+    const response = await fetch(url.toString(), {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    })
+
+    if (!response.ok) {
+      throw new Error("Failed to fetch reports")
+    }
 
-      if (!response.ok) {
-        throw new Error("Failed to fetch reports")
-      }
+    return response.json()
+  }
 
-      const data = await response.json()
+  // Load the first page of staff reports
+  const loadReports = async () => {
+    loadStats()
+    try {
+      setIsLoading(true)
+      setError("")
+
+      const data = await fetchReportsPage()
       setReports(data.issues || [])
+      setNextCursor(data.next_cursor ?? null)
     } catch (err: any) {
       setError(err.message || "Failed to load reports")
     } finally {
@@ -80,6 +105,21 @@ export default function StaffDashboardPage() {
     }
   }
 
+  // Append the next page of staff reports
+  const loadMoreReports = async () => {
+    if (!nextCursor) return
+    try {
+      setIsLoadingMore(true)
+      const data = await fetchReportsPage(nextCursor)
+      setReports(prev => [...prev, ...(data.issues || [])])
+      setNextCursor(data.next_cursor ?? null)
+    } catch (err: any) {
+      setError(err.message || "Failed to load reports")
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   // Update issue status
   const updateStatus = async (issueId: string, newStatus: string) => {
     try {
@@ -115,6 +155,7 @@ export default function StaffDashboardPage() {
             : report
         )
       )
+      loadStats()
 
       // Clear success message after 3 seconds
       setTimeout(() => setSuccess(""), 3000)
@@ -171,10 +212,10 @@ export default function StaffDashboardPage() {
   }
 
   const stats = {
-    total: reports.length,
-    pending: reports.filter(r => r.status === "Pending").length,
-    inProgress: reports.filter(r => r.status === "In Progress").length,
-    resolved: reports.filter(r => r.status === "Resolved").length,
+    total: counters?.total ?? 0,
+    pending: counters?.by_status["Pending"] ?? 0,
+    inProgress: counters?.by_status["In Progress"] ?? 0,
+    resolved: counters?.by_status["Resolved"] ?? 0,
   }
 
   return (
@@ -443,6 +484,14 @@ export default function StaffDashboardPage() {
                       </TableBody>
                     </Table>
                   )}
+
+                  {nextCursor && !isLoading && (
+                    <div className="text-center pt-4">
+                      <Button variant="outline" onClick={loadMoreReports} disabled={isLoadingMore}>
+                        {isLoadingMore ? "Loading..." : "Load more issues"}
+                      </Button>
+                    </div>
+                  )}
                 </CardContent>
               </Card>
             </TabsContent>
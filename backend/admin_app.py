@@ -1,11 +1,18 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
-from bson import ObjectId
-from datetime import datetime, timedelta
-import requests
+from flask_jwt_extended import JWTManager, get_jwt_identity
+from datetime import timedelta
+import os
 
+from auth import TOKEN_REVOCATIONS_COLLECTION, RevocationList, role_required
+from bridge import NotificationBridge
+from cache import UserProfileCache
 from common import initialize_database
+from listing import list_issues, parse_page_args
+from outbox import OUTBOX_COLLECTION, Outbox, OutboxDispatcher, deferred, supports_transactions
+from realtime import ISSUE_CACHE_EVENT, MESSAGE_QUEUE_ENV, RealtimeDelivery, create_socketio, user_room
+from stats import STATS_COLLECTION, ensure_stats, read_stats
+from status_service import IssueStatusService, StatusUpdateError
 
 USER_SERVICE_URL = 'http://localhost:5000'
 
@@ -17,100 +24,134 @@ jwt = JWTManager(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 client, db, users_collection, issues_collection, notifications_collection = initialize_database()
+# Write-only emitter into the user workers' Socket.IO message queue, when one is configured
+realtime = RealtimeDelivery(create_socketio()) if os.environ.get(MESSAGE_QUEUE_ENV) else None
+# Persistent-session, batching sender for /internal/emit_batch when there is no shared queue
+bridge = NotificationBridge(USER_SERVICE_URL)
+user_cache = UserProfileCache(users_collection, max_entries=10000, ttl=300)
+# Admin routes trust the signed role claim; tokens of users whose role changed are refused from this list
+revocations = RevocationList(db[TOKEN_REVOCATIONS_COLLECTION], token_lifetime=app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+revocations.install(jwt)
+revocations.start()
+stats_collection = db[STATS_COLLECTION]
+ensure_stats(issues_collection, stats_collection)
+
+
+@deferred
+def notify_user_service(transitions, done):
+    """Reach each reporter's room and drop the user service's cached listings.
+
+    With a shared Socket.IO message queue this emits directly to every user
+    worker; otherwise the events are batched to the user service over HTTP
+    and `done` runs when the user service acknowledges them.
+    """
+    if realtime:
+        for transition in transitions:
+            issue = transition['issue']
+            realtime.emit('notification', {
+                'title': 'Issue Status Updated',
+                'message': f"Your issue '{issue['title']}' is now {transition['status']}",
+                'type': 'issue_status',
+                'issue_id': transition['issue_id'],
+                'status': transition['status'],
+                'created_at': transition['updated_at'].isoformat(),
+            }, [user_room(issue['user_id'])])
+        for category in {transition['issue']['category'] for transition in transitions}:
+            realtime.publish_app_event(ISSUE_CACHE_EVENT, {'category': category, 'statuses': []})
+        done()
+        return
+
+    # Queued for the background bridge; BridgeQueueFull, or a failure reported to done, makes the outbox retry
+    bridge.send([{
+        'user_id': transition['issue']['user_id'],
+        'category': transition['issue']['category'],
+        'title': 'Issue Status Updated',
+        'message': f"Your issue '{transition['issue']['title']}' is now {transition['status']}",
+        'payload': {
+            'type': 'issue_status',
+            'issue_id': transition['issue_id'],
+            'status': transition['status'],
+            'created_at': transition['updated_at'].isoformat(),
+        },
+    } for transition in transitions], done)
+
+
+outbox = Outbox(db[OUTBOX_COLLECTION], origin='admin_app')
+status_service = IssueStatusService(issues_collection, notifications_collection, stats_collection, user_cache, outbox,
+                                    side_effects=[notify_user_service],
+                                    use_transactions=supports_transactions(client))
+# Counters, notifications and the user service call run here, off the request path
+outbox_dispatcher = OutboxDispatcher(outbox, status_service.event_handlers())
+outbox_dispatcher.start()
 
 
 @app.route('/admin/reports', methods=['GET'])
-@jwt_required()
+@role_required('admin')
 def get_admin_reports():
-    user_id = get_jwt_identity()
-    user = users_collection.find_one({'_id': ObjectId(user_id)})
-    if not user or user['role'] != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-
     category = request.args.get('category')
     status = request.args.get('status')
     location = request.args.get('location')
+    try:
+        limit, cursor = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     query = {}
     if category:
         query['category'] = category
     if status:
         query['status'] = status
-    if location:
-        query['location.address'] = {'$regex': location, '$options': 'i'}
 
-    issues = list(issues_collection.find(query).sort('created_at', -1))
-    for issue in issues:
-        u = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-        issue['user_name'] = u['name'] if u else 'Unknown'
-        issue['user_email'] = u['email'] if u else 'Unknown'
-        issue['_id'] = str(issue['_id'])
-        issue['created_at'] = issue['created_at'].isoformat()
-        issue['updated_at'] = issue['updated_at'].isoformat()
-    return jsonify({'issues': issues}), 200
+    issues, next_cursor = list_issues(issues_collection, user_cache, query, include_email=True,
+                                      limit=limit, cursor=cursor, search=location)
+    return jsonify({'issues': issues, 'next_cursor': next_cursor}), 200
+
+
+@app.route('/admin/stats', methods=['GET'])
+@role_required('admin')
+def get_admin_stats():
+    return jsonify(read_stats(stats_collection, category=request.args.get('category'))), 200
 
 
 @app.route('/admin/update', methods=['POST'])
-@jwt_required()
+@role_required('admin')
 def update_issue_status():
     user_id = get_jwt_identity()
-    user = users_collection.find_one({'_id': ObjectId(user_id)})
-    if not user or user['role'] != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-
     data = request.get_json()
     issue_id = data.get('issue_id')
     new_status = data.get('status')
     if not issue_id or not new_status:
         return jsonify({'error': 'Missing issue_id or status'}), 400
-    if new_status not in ['Pending', 'In Progress', 'Resolved']:
-        return jsonify({'error': 'Invalid status'}), 400
 
-    result = issues_collection.update_one({'_id': ObjectId(issue_id)}, {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}})
-    if result.matched_count == 0:
-        return jsonify({'error': 'Issue not found'}), 404
+    try:
+        status_service.transition(issue_id, new_status, user_id, 'admin')
+    except StatusUpdateError as e:
+        return jsonify({'error': e.message}), e.status_code
 
-    issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
-    issue_user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
+    return jsonify({'message': 'Status updated successfully'}), 200
 
-    # Store notification for user
-    notification = {
-        'user_id': issue['user_id'],
-        'type': 'issue_status',
-        'title': 'Issue Status Updated',
-        'message': f"Your issue '{issue['title']}' is now {new_status}",
-        'issue_id': issue_id,
-        'status': new_status,
-        'read': False,
-        'created_at': datetime.utcnow()
-    }
-    notifications_collection.insert_one(notification)
-
-    # Ask user service to emit to that user's room
+
+@app.route('/admin/bulk-update', methods=['POST'])
+@role_required('admin')
+def bulk_update_issue_status():
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
     try:
-        requests.post(f"{USER_SERVICE_URL}/internal/emit_user_notification", json={
-            'user_id': issue['user_id'],
-            'title': 'Issue Status Updated',
-            'message': f"Your issue '{issue['title']}' is now {new_status}",
-            'payload': {
-                'type': 'issue_status',
-                'issue_id': issue_id,
-                'status': new_status,
-                'created_at': datetime.utcnow().isoformat(),
-            },
-        }, timeout=2)
-    except Exception as e:
-        print(f"Failed to notify user service: {e}")
+        updated, skipped = status_service.bulk_transition(data.get('issue_ids'), data.get('status'), user_id, 'admin')
+    except StatusUpdateError as e:
+        return jsonify({'error': e.message}), e.status_code
 
-    return jsonify({'message': 'Status updated successfully'}), 200
+    return jsonify({'updated': len(updated), 'skipped': skipped}), 200
 
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    return jsonify({'status': 'ok', 'outbox': outbox_dispatcher.stats(), 'bridge': bridge.stats(),
+                    'revocations': revocations.stats()}), 200
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    # No reloader: its parent process would run a second outbox dispatcher and bridge
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5001)
 
 
@@ -1,20 +1,32 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, session
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from flask_socketio import emit, join_room, leave_room
+from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from bson import ObjectId
 from datetime import datetime, timedelta
 import os
-import uuid
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import threading
+
+from auth import TOKEN_REVOCATIONS_COLLECTION, RevocationList, role_required
+from cache import FilterKeyedCache, ResponseCache, UserProfileCache, conditional_json_response
+from common import ensure_indexes
+from digest import DIGEST_COLLECTION, ReporterDigest
+from geo import (cluster_issues, find_nearby, find_within, make_point, parse_bbox, parse_map_limit,
+                 parse_zoom, MAX_RADIUS_METERS)
+from listing import address_prefixes, list_issues, parse_page_args, present_issues
+from mailer import PooledMailer
+from outbox import OUTBOX_COLLECTION, Outbox, OutboxDispatcher, supports_transactions
+from passwords import (DEFAULT_METHOD, PASSWORD_METHOD_ENV, PASSWORD_WORKERS_ENV, PasswordHasher,
+                       PasswordHasherBusy, authenticate)
+from realtime import ISSUE_CACHE_EVENT, RealtimeDelivery, create_socketio, rooms_for_token
+from stats import STATS_COLLECTION, ensure_stats, read_stats, record_new_issue
+from thumbnails import ThumbnailPipeline
+from upload_sessions import UPLOAD_SESSIONS_COLLECTION, UploadSessions
+from uploads import (MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES, UPLOADS_COLLECTION, UploadError,
+                     configure_upload_serving, serve_upload, store_upload)
+from status_service import IssueStatusService, StatusUpdateError, render_bulk_status_email
 
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
@@ -22,18 +34,24 @@ app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
 # Email configuration
 EMAIL_CONFIG = {
-    'SMTP_SERVER': 'smtp.gmail.com',
-    'SMTP_PORT': 587,
+    'SMTP_SERVER': os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
+    'SMTP_PORT': int(os.environ.get('SMTP_PORT', 587)),
     'EMAIL_ADDRESS': 'civicreport.system@gmail.com',  # Replace with your email
-    'EMAIL_PASSWORD': 'your-app-password',  # Replace with your app password
-    'USE_TLS': True
+    'EMAIL_PASSWORD': os.environ.get('EMAIL_PASSWORD', 'your-app-password'),  # Replace with your app password
+    'USE_TLS': os.environ.get('SMTP_USE_TLS', '1') == '1'
 }
 app.config['UPLOAD_FOLDER'] = 'uploads'
+# Werkzeug rejects larger request bodies with 413 before reading them
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+configure_upload_serving(app)
 
 # Initialize extensions
 jwt = JWTManager(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Set SOCKETIO_MESSAGE_QUEUE to run several workers that share rooms (see realtime.py)
+socketio = create_socketio(app, cors_allowed_origins="*")
+# Room-targeted emits with per-event fan-out counters
+realtime = RealtimeDelivery(socketio)
 
 def initialize_database():
     """Initialize MongoDB connection and create necessary indexes"""
@@ -53,21 +71,8 @@ def initialize_database():
         
         # Create indexes for better performance (only created if they don't exist)
         try:
-            # User collection indexes
-            users_collection.create_index([("email", ASCENDING)], unique=True, background=True)
-            users_collection.create_index([("role", ASCENDING)], background=True)
-            
-            # Issues collection indexes
-            issues_collection.create_index([("user_id", ASCENDING)], background=True)
-            issues_collection.create_index([("status", ASCENDING)], background=True)
-            issues_collection.create_index([("category", ASCENDING)], background=True)
-            issues_collection.create_index([("created_at", DESCENDING)], background=True)
-            issues_collection.create_index([("location.address", "text")], background=True)
-            
-            # Notifications collection indexes
-            notifications_collection.create_index([("user_id", ASCENDING)], background=True)
-            notifications_collection.create_index([("read", ASCENDING)], background=True)
-            notifications_collection.create_index([("created_at", DESCENDING)], background=True)
+            # Route query-shape compound indexes, including address search (see common.INDEXES)
+            ensure_indexes(db)
             print("✅ Database indexes created/verified")
             
         except Exception as e:
@@ -90,51 +95,104 @@ except Exception as e:
     print("Failed to initialize database. Exiting...")
     exit(1)
 
+# Projected user profiles shared by all handlers (no password hashes)
+user_cache = UserProfileCache(users_collection, max_entries=10000, ttl=300)
+
+# Admin routes trust the signed role claim; tokens of users whose role changed are refused from this list
+revocations = RevocationList(db[TOKEN_REVOCATIONS_COLLECTION], token_lifetime=app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+revocations.install(jwt)
+revocations.start()
+
+# Per-category status counters maintained on every write (see stats.py)
+stats_collection = db[STATS_COLLECTION]
+ensure_stats(issues_collection, stats_collection)
+
 # Create uploads directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Reference-counted, content-addressed images (see uploads.py)
+uploads_collection = db[UPLOADS_COLLECTION]
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Serialized /issues responses keyed by filter; invalidated by report/status writes
+issues_cache = ResponseCache(max_entries=256)
+# Map cluster tiles keyed by (category, status, zoom, tile x, tile y)
+cluster_cache = FilterKeyedCache(max_entries=4096)
 
-# Email sending function
-def send_email_notification(to_email, subject, body):
-    """Send email notification in a separate thread"""
-    def send_email():
-        try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_CONFIG['EMAIL_ADDRESS']
-            msg['To'] = to_email
-            msg['Subject'] = subject
+def invalidate_local_issue_caches(category=None, statuses=()):
+    issues_cache.invalidate(category=category, statuses=statuses)
+    cluster_cache.invalidate(category=category, statuses=statuses)
 
-            # Add body to email
-            msg.attach(MIMEText(body, 'html'))
+def invalidate_issue_caches(category=None, statuses=()):
+    """Drop cached listings and map tiles that a write to an issue of `category` affects, in every worker"""
+    realtime.publish_app_event(ISSUE_CACHE_EVENT, {'category': category, 'statuses': list(statuses)})
 
-            # Create SMTP session
-            server = smtplib.SMTP(EMAIL_CONFIG['SMTP_SERVER'], EMAIL_CONFIG['SMTP_PORT'])
-            if EMAIL_CONFIG['USE_TLS']:
-                server.starttls()  # Enable security
+realtime.on_app_event(ISSUE_CACHE_EVENT,
+                      lambda data: invalidate_local_issue_caches(data['category'], tuple(data['statuses'])))
 
-            # Login with sender's email and password
-            server.login(EMAIL_CONFIG['EMAIL_ADDRESS'], EMAIL_CONFIG['EMAIL_PASSWORD'])
+# Resumable chunked uploads for flaky mobile connections; attached to a report by upload_id
+upload_sessions = UploadSessions(db[UPLOAD_SESSIONS_COLLECTION], app.config['UPLOAD_FOLDER'], uploads_collection)
+upload_sessions.start_reaper()
 
-            # Send email
-            text = msg.as_string()
-            server.sendmail(EMAIL_CONFIG['EMAIL_ADDRESS'], to_email, text)
-            server.quit()
+# Resized WebP variants of report images, made off the request path (see thumbnails.py)
+thumbnails = ThumbnailPipeline(app.config['UPLOAD_FOLDER'], issues_collection, uploads_collection, workers=2,
+                               on_recorded=lambda category: invalidate_issue_caches(category=category))
 
-            print(f"✅ Email sent successfully to {to_email}")
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-        except Exception as e:
-            print(f"❌ Failed to send email to {to_email}: {e}")
+# Password hashing off the request thread; changing PASSWORD_HASH_METHOD rehashes users as they log in
+password_hasher = PasswordHasher(method=os.environ.get(PASSWORD_METHOD_ENV, DEFAULT_METHOD),
+                                 workers=int(os.environ.get(PASSWORD_WORKERS_ENV, 2)))
+
+# Reused SMTP connections on a small worker pool; bounded queue for backpressure
+mailer = PooledMailer(EMAIL_CONFIG, workers=2, max_queue=1000)
 
-    # Send email in background thread
-    email_thread = threading.Thread(target=send_email)
-    email_thread.daemon = True
-    email_thread.start()
+# Email sending function
+def send_email_notification(to_email, subject, body):
+    """Queue an email for the mailer workers; waits briefly if the queue is full.
+
+    Raises EmailQueueFull after that, so the outbox or digest retries it later
+    instead of the email being dropped.
+    """
+    mailer.send(to_email, subject, body, timeout=5)
+
+# Runs inline once a status update is committed, with the updated issue documents
+def invalidate_after_transition(issues):
+    for issue in issues:
+        invalidate_issue_caches(category=issue['category'], statuses=(issue.get('previous_status'), issue['status']))
+
+def send_reporter_digest(transitions):
+    """One email covering every update a reporter received in the digest window"""
+    reporter = transitions[-1]['reporter']
+    if reporter and reporter.get('email'):
+        subject, body = render_bulk_status_email(transitions)
+        send_email_notification(reporter['email'], subject, body)
+
+# EMAIL_DIGEST_SECONDS > 0 coalesces a reporter's updates into one email per window, kept in MongoDB
+# until sent; the default 0 sends one email per status change request straight from the outbox
+email_digest = ReporterDigest(send_reporter_digest, db[DIGEST_COLLECTION],
+                              window_seconds=int(os.environ.get('EMAIL_DIGEST_SECONDS', 0)))
+email_digest.start()
+
+# Status update side effects, run by the outbox dispatcher with the transitions of one request
+def email_reporters(transitions):
+    email_digest.add(transitions)
+
+def broadcast_transition(transitions):
+    # Reporter rooms, the category's staff and admins only; never every client
+    realtime.status_changed(transitions)
+
+outbox = Outbox(db[OUTBOX_COLLECTION], origin='app')
+status_service = IssueStatusService(
+    issues_collection, notifications_collection, stats_collection, user_cache, outbox,
+    side_effects=[email_reporters, broadcast_transition],
+    on_commit=[invalidate_after_transition],
+    use_transactions=supports_transactions(client)
+)
+outbox_dispatcher = OutboxDispatcher(outbox, status_service.event_handlers())
+outbox_dispatcher.start()
 
 # Authentication Routes
 @app.route('/register', methods=['POST'])
@@ -163,7 +221,7 @@ def register():
             return jsonify({'error': 'User already exists'}), 400
 
         # Hash password and create user
-        hashed_password = generate_password_hash(password)
+        hashed_password = password_hasher.hash(password)
         user_data = {
             'name': name,
             'email': email,
@@ -177,6 +235,7 @@ def register():
             user_data['category'] = category
 
         result = users_collection.insert_one(user_data)
+        user_cache.invalidate(result.inserted_id)
 
         # Create JWT token with additional claims
         additional_claims = {'role': role}
@@ -204,6 +263,8 @@ def register():
             'user': user_response
         }), 201
 
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -217,8 +278,8 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Missing email or password'}), 400
 
-        user = users_collection.find_one({'email': email})
-        if not user or not check_password_hash(user['password'], password):
+        user = authenticate(users_collection, password_hasher, email, password)
+        if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
 
         # Create JWT token with additional claims
@@ -248,6 +309,56 @@ def login():
             'user': user_response
         }), 200
 
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Resumable Upload Routes
+@app.route('/upload-sessions', methods=['POST'])
+@jwt_required()
+def create_upload_session():
+    """Start a resumable image upload: {size} -> {upload_id, chunk_size, offset}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        return jsonify(upload_sessions.create(get_jwt_identity(), data.get('size'))), 201
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-sessions/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload_session(upload_id):
+    """How many bytes arrived, so the client resumes from there"""
+    try:
+        return jsonify(upload_sessions.status(upload_id, get_jwt_identity())), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-sessions/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id, index):
+    """Raw bytes of chunk `index`; 409 with the current offset if it is not the next one"""
+    try:
+        state = upload_sessions.write_chunk(upload_id, get_jwt_identity(), index,
+                                            request.stream, request.content_length)
+        return jsonify(state), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-sessions/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload_session(upload_id):
+    """Verify the assembled image; its upload_id can then be sent with /report"""
+    try:
+        return jsonify(upload_sessions.complete(upload_id, get_jwt_identity())), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -258,16 +369,6 @@ def submit_report():
     try:
         user_id = get_jwt_identity()
         
-        # Handle file upload
-        image_filename = None
-        if 'image' in request.files:
-            file = request.files['image']
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4()}_{filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-                image_filename = unique_filename
-        
         # Get form data
         title = request.form.get('title')
         description = request.form.get('description')
@@ -278,6 +379,26 @@ def submit_report():
         
         if not title or not description or not category:
             return jsonify({'error': 'Missing required fields'}), 400
+
+        # Handle file upload: hashed while streamed to disk, stored once per distinct image
+        image_filename = None
+        image_meta = None
+        upload_id = request.form.get('upload_id')
+        if upload_id:
+            # Image already sent through /upload-sessions
+            try:
+                image_meta = upload_sessions.attach(upload_id, user_id)
+            except UploadError as e:
+                return jsonify(e.to_dict()), e.status_code
+            image_filename = image_meta['filename']
+        elif 'image' in request.files:
+            file = request.files['image']
+            if file and allowed_file(file.filename):
+                try:
+                    image_meta = store_upload(file, app.config['UPLOAD_FOLDER'], uploads_collection)
+                except UploadError as e:
+                    return jsonify({'error': e.message}), e.status_code
+                image_filename = image_meta['filename']
         
         # Create issue document
         issue_data = {
@@ -287,33 +408,40 @@ def submit_report():
             'category': category,
             'status': 'Pending',
             'image': image_filename,
+            'image_meta': image_meta,
             'location': {
                 'latitude': float(latitude) if latitude else None,
                 'longitude': float(longitude) if longitude else None,
-                'address': address
+                'address': address,
+                'address_prefixes': address_prefixes(address)
             },
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
         
+        # GeoJSON point for the 2dsphere map queries
+        point = make_point(latitude, longitude)
+        if point:
+            issue_data['location']['point'] = point
+
         result = issues_collection.insert_one(issue_data)
         issue_data['_id'] = str(result.inserted_id)
+        record_new_issue(stats_collection, category)
+        invalidate_issue_caches(category=category, statuses=('Pending',))
+        if image_filename:
+            # The issue is stored already; a failed submit must not turn into a 500 the client retries
+            try:
+                thumbnails.submit(image_filename, category)
+            except Exception as e:
+                print(f"Failed to queue thumbnails for {image_filename}: {e}")
         
         # Get user info for broadcast
-        user = users_collection.find_one({'_id': ObjectId(user_id)})
+        user = user_cache.get(user_id)
         issue_data['user_name'] = user['name']
         
-        # Notify only admins about new issue
+        # Notify admins and the category's staff about the new issue
         try:
-            socketio.emit('notification', {
-                'title': 'New Issue Reported',
-                'message': f"New issue reported by {user['name']}: {title}",
-                'type': 'new_issue',
-                'issue_id': str(result.inserted_id),
-                'status': 'Pending',
-                'created_at': issue_data['created_at'].isoformat()
-            }, room='admins')
-            print("Admin notification emitted to room 'admins'")
+            realtime.new_issue({**issue_data, '_id': result.inserted_id}, user['name'])
         except Exception as e:
             print(f"Failed to emit admin notification: {e}")
         
@@ -330,15 +458,15 @@ def submit_report():
 def get_my_reports():
     try:
         user_id = get_jwt_identity()
-        issues = list(issues_collection.find({'user_id': user_id}).sort('created_at', -1))
-        
-        # Convert ObjectId to string and format dates
-        for issue in issues:
-            issue['_id'] = str(issue['_id'])
-            issue['created_at'] = issue['created_at'].isoformat()
-            issue['updated_at'] = issue['updated_at'].isoformat()
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        issues, next_cursor = list_issues(issues_collection, user_cache, {'user_id': user_id},
+                                          with_reporter=False, limit=limit, cursor=cursor)
         
-        return jsonify({'issues': issues}), 200
+        return jsonify({'issues': issues, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -349,26 +477,114 @@ def get_all_issues():
         # Get query parameters for filtering
         category = request.args.get('category')
         status = request.args.get('status')
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Build query
+        # Serve from the response cache when this filter/page was already rendered
+        cache_key = (category or None, status or None, limit, request.args.get('cursor'))
+        entry = issues_cache.get(cache_key)
+        if entry is None:
+            generation = issues_cache.generation
+
+            # Build query
+            query = {}
+            if category:
+                query['category'] = category
+            if status:
+                query['status'] = status
+            
+            # Reporter names are resolved in one batched lookup
+            issues, next_cursor = list_issues(issues_collection, user_cache, query, limit=limit, cursor=cursor)
+            entry = issues_cache.store(cache_key, app.json.dumps({'issues': issues, 'next_cursor': next_cursor}), generation)
+        
+        return conditional_json_response(entry)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/issues/stats', methods=['GET'])
+def get_issue_stats():
+    """Public totals per status (optionally for one category), served from the counters collection"""
+    try:
+        stats = read_stats(stats_collection, category=request.args.get('category'))
+        return jsonify({'total': stats['total'], 'by_status': stats['by_status']}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/issues/nearby', methods=['GET'])
+def get_nearby_issues():
+    """Issues within `radius` meters of lat/lng, nearest first"""
+    try:
+        try:
+            latitude = float(request.args['lat'])
+            longitude = float(request.args['lng'])
+            radius = min(float(request.args.get('radius', '1000')), MAX_RADIUS_METERS)
+            limit = parse_map_limit(request.args.get('limit'))
+        except (KeyError, ValueError):
+            return jsonify({'error': 'lat and lng are required; radius and limit must be numbers'}), 400
+
+        query = {}
+        if request.args.get('category'):
+            query['category'] = request.args['category']
+        if request.args.get('status'):
+            query['status'] = request.args['status']
+
+        issues = find_nearby(issues_collection, query, latitude, longitude, radius, limit)
+        return jsonify({'issues': present_issues(issues, user_cache)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/issues/within', methods=['GET'])
+def get_issues_within():
+    """Issues inside the map viewport bbox=minLng,minLat,maxLng,maxLat"""
+    try:
+        try:
+            bbox = parse_bbox(request.args.get('bbox'))
+            limit = parse_map_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = {}
+        if request.args.get('category'):
+            query['category'] = request.args['category']
+        if request.args.get('status'):
+            query['status'] = request.args['status']
+
+        issues = find_within(issues_collection, query, bbox, limit)
+        return jsonify({'issues': present_issues(issues, user_cache), 'truncated': len(issues) == limit}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/issues/clusters', methods=['GET'])
+def get_issue_clusters():
+    """Pre-aggregated map clusters (count + status breakdown per grid cell) for bbox and zoom"""
+    try:
+        try:
+            bbox = parse_bbox(request.args.get('bbox'))
+            zoom = parse_zoom(request.args.get('zoom'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        category = request.args.get('category') or None
+        status = request.args.get('status') or None
         query = {}
         if category:
             query['category'] = category
         if status:
             query['status'] = status
-        
-        issues = list(issues_collection.find(query).sort('created_at', -1))
-        
-        # Add user names and format data
-        for issue in issues:
-            user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-            issue['user_name'] = user['name'] if user else 'Unknown'
-            issue['_id'] = str(issue['_id'])
-            issue['created_at'] = issue['created_at'].isoformat()
-            issue['updated_at'] = issue['updated_at'].isoformat()
-        
-        return jsonify({'issues': issues}), 200
-        
+
+        try:
+            clusters = cluster_issues(issues_collection, query, bbox, zoom,
+                                      tile_cache=cluster_cache, filter_key=(category, status))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'zoom': zoom, 'clusters': clusters}), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -384,8 +600,8 @@ def staff_login():
         if not email or not password:
             return jsonify({'error': 'Missing email or password'}), 400
 
-        user = users_collection.find_one({'email': email})
-        if not user or not check_password_hash(user['password'], password):
+        user = authenticate(users_collection, password_hasher, email, password)
+        if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
 
         # Verify this is a staff user
@@ -416,6 +632,8 @@ def staff_login():
             'user': user_response
         }), 200
 
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -430,8 +648,8 @@ def admin_login():
         if not email or not password:
             return jsonify({'error': 'Missing email or password'}), 400
 
-        user = users_collection.find_one({'email': email})
-        if not user or not check_password_hash(user['password'], password):
+        user = authenticate(users_collection, password_hasher, email, password)
+        if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
 
         # Verify this is an admin user
@@ -459,6 +677,8 @@ def admin_login():
             'user': user_response
         }), 200
 
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -483,41 +703,52 @@ def get_staff_reports():
         # Get query parameters
         status = request.args.get('status')
         location = request.args.get('location')
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         # Build query - filter by staff category
         query = {'category': user_category}
         if status:
             query['status'] = status
-        if location:
-            query['location.address'] = {'$regex': location, '$options': 'i'}
-
-        issues = list(issues_collection.find(query).sort('created_at', -1))
 
-        # Add user names and format data
-        for issue in issues:
-            user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-            issue['user_name'] = user['name'] if user else 'Unknown'
-            issue['user_email'] = user['email'] if user else 'Unknown'
-            issue['_id'] = str(issue['_id'])
-            issue['created_at'] = issue['created_at'].isoformat()
-            issue['updated_at'] = issue['updated_at'].isoformat()
+        # Reporter names/emails are resolved in one batched lookup; location
+        # searches match address word prefixes, newest first
+        issues, next_cursor = list_issues(issues_collection, user_cache, query, include_email=True,
+                                          limit=limit, cursor=cursor, search=location)
 
         return jsonify({
             'issues': issues,
             'category': user_category,
-            'total_count': len(issues)
+            'next_cursor': next_cursor
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/staff/stats', methods=['GET'])
+@jwt_required()
+def get_staff_stats():
+    """Status counters for the staff member's category"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'staff':
+            return jsonify({'error': 'Staff access required'}), 403
+        if not claims.get('category'):
+            return jsonify({'error': 'Staff category not found'}), 403
+
+        stats = read_stats(stats_collection, category=claims['category'])
+        return jsonify({'category': claims['category'], 'total': stats['total'], 'by_status': stats['by_status']}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/staff/reports/<issue_id>/status', methods=['PUT'])
 @jwt_required()
 def staff_update_issue_status_put(issue_id):
     """Staff endpoint to update issue status via PUT method"""
     try:
-        from flask_jwt_extended import get_jwt
-
         user_id = get_jwt_identity()
         claims = get_jwt()
         user_role = claims.get('role')
@@ -526,6 +757,8 @@ def staff_update_issue_status_put(issue_id):
         # Verify staff access
         if user_role != 'staff':
             return jsonify({'error': 'Staff access required'}), 403
+        if not user_category:
+            return jsonify({'error': 'Staff category not found'}), 403
 
         data = request.get_json()
         new_status = data.get('status')
@@ -533,61 +766,11 @@ def staff_update_issue_status_put(issue_id):
         if not new_status:
             return jsonify({'error': 'Status is required'}), 400
 
-        # Validate status
-        valid_statuses = ['Pending', 'In Progress', 'Resolved']
-        if new_status not in valid_statuses:
-            return jsonify({'error': f'Invalid status. Must be one of: {valid_statuses}'}), 400
-
-        # Find the issue and verify it belongs to staff's category
-        issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
-        if not issue:
-            return jsonify({'error': 'Issue not found'}), 404
-
-        if issue['category'] != user_category:
-            return jsonify({'error': 'Access denied. Issue not in your category.'}), 403
-
-        # Update the issue status
-        result = issues_collection.update_one(
-            {'_id': ObjectId(issue_id)},
-            {
-                '$set': {
-                    'status': new_status,
-                    'updated_at': datetime.utcnow(),
-                    'updated_by': user_id,
-                    'updated_by_role': 'staff'
-                }
-            }
-        )
-
-        if result.modified_count == 0:
-            return jsonify({'error': 'Failed to update issue status'}), 500
-
-        # Send email notification to user
+        # The category guard is part of the update filter
         try:
-            send_status_update_email(issue, new_status)
-        except Exception as email_error:
-            print(f"Email notification failed: {email_error}")
-
-        # Create notification for user
-        notification = {
-            'user_id': issue['user_id'],
-            'type': 'status_update',
-            'title': f'Issue Status Updated: {issue["title"]}',
-            'message': f'Your issue status has been updated to "{new_status}" by {user_category} department staff.',
-            'issue_id': issue_id,
-            'status': new_status,
-            'read': False,
-            'created_at': datetime.utcnow()
-        }
-        notifications_collection.insert_one(notification)
-
-        # Emit real-time update
-        socketio.emit('issue_updated', {
-            'issue_id': issue_id,
-            'status': new_status,
-            'category': issue['category'],
-            'updated_by': 'staff'
-        })
+            status_service.transition(issue_id, new_status, user_id, 'staff', category=user_category)
+        except StatusUpdateError as e:
+            return jsonify({'error': e.message}), e.status_code
 
         return jsonify({
             'message': f'Issue status updated to {new_status}',
@@ -602,8 +785,6 @@ def staff_update_issue_status_put(issue_id):
 @jwt_required()
 def staff_update_issue_status():
     try:
-        from flask_jwt_extended import get_jwt
-
         user_id = get_jwt_identity()
         claims = get_jwt()
         user_role = claims.get('role')
@@ -612,6 +793,8 @@ def staff_update_issue_status():
         # Verify staff access
         if user_role != 'staff':
             return jsonify({'error': 'Staff access required'}), 403
+        if not user_category:
+            return jsonify({'error': 'Staff category not found'}), 403
 
         data = request.get_json()
         issue_id = data.get('issue_id')
@@ -620,115 +803,11 @@ def staff_update_issue_status():
         if not issue_id or not new_status:
             return jsonify({'error': 'Missing issue_id or status'}), 400
 
-        if new_status not in ['Pending', 'In Progress', 'Resolved']:
-            return jsonify({'error': 'Invalid status'}), 400
-
-        # Get the issue first to verify category access
-        issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
-        if not issue:
-            return jsonify({'error': 'Issue not found'}), 404
-
-        # Verify staff can only update issues in their category
-        if issue['category'] != user_category:
-            return jsonify({'error': 'Access denied: Issue not in your category'}), 403
-
-        # Update issue
-        result = issues_collection.update_one(
-            {'_id': ObjectId(issue_id)},
-            {
-                '$set': {
-                    'status': new_status,
-                    'updated_at': datetime.utcnow(),
-                    'updated_by': user_id,
-                    'updated_by_role': 'staff'
-                }
-            }
-        )
-
-        if result.matched_count == 0:
-            return jsonify({'error': 'Issue not found'}), 404
-
-        # Get updated issue for broadcast
-        updated_issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
-        issue_user = users_collection.find_one({'_id': ObjectId(updated_issue['user_id'])})
-        staff_user = users_collection.find_one({'_id': ObjectId(user_id)})
-
-        # Create notification for the issue reporter
-        notification = {
-            'user_id': updated_issue['user_id'],
-            'type': 'issue_status',
-            'title': 'Issue Status Updated',
-            'message': f"Your issue '{updated_issue['title']}' is now {new_status} (Updated by {staff_user['name']} - {user_category} Staff)",
-            'issue_id': issue_id,
-            'status': new_status,
-            'read': False,
-            'created_at': datetime.utcnow()
-        }
-        notifications_collection.insert_one(notification)
-
-        # Send email notification to the issue reporter
-        if issue_user and issue_user.get('email'):
-            email_subject = f"Issue Status Update - {updated_issue['title']}"
-            email_body = f"""
-            <html>
-            <body>
-                <h2>Your Civic Issue Status Has Been Updated</h2>
-                <p>Dear {issue_user['name']},</p>
-
-                <p>We wanted to inform you that the status of your reported issue has been updated:</p>
-
-                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>Issue Details:</h3>
-                    <p><strong>Title:</strong> {updated_issue['title']}</p>
-                    <p><strong>New Status:</strong> <span style="color: #007bff; font-weight: bold;">{new_status}</span></p>
-                    <p><strong>Updated by:</strong> {staff_user['name']} ({user_category} Department)</p>
-                    <p><strong>Date:</strong> {datetime.utcnow().strftime('%B %d, %Y at %I:%M %p')}</p>
-                </div>
-
-                <p>Thank you for helping improve our community by reporting this issue.</p>
-
-                <p>Best regards,<br>
-                Civic Issue Reporting System</p>
-            </body>
-            </html>
-            """
-            send_email_notification(issue_user['email'], email_subject, email_body)
-
-        # Broadcast status update
-        socketio.emit('status_update', {
-            'issue_id': issue_id,
-            'status': new_status,
-            'title': updated_issue['title'],
-            'user_name': issue_user['name'] if issue_user else 'Unknown',
-            'updated_by': f"{staff_user['name']} ({user_category} Staff)"
-        })
-
-        # Emit user-targeted notification
+        # Staff can only update issues in their category (enforced in the update filter)
         try:
-            room_name = f"user_{updated_issue['user_id']}"
-            socketio.emit('user_notification', {
-                'title': updated_issue['title'],
-                'message': f"Your issue '{updated_issue['title']}' status has been updated to: {new_status}",
-                'type': 'issue_status',
-                'issue_id': issue_id,
-                'status': new_status,
-                'updated_by': f"{staff_user['name']} ({user_category} Staff)",
-                'created_at': datetime.utcnow().isoformat()
-            }, room=room_name)
-
-            # Also emit to all users (for the user's dashboard)
-            socketio.emit('user_notification', {
-                'title': updated_issue['title'],
-                'message': f"Your issue '{updated_issue['title']}' status has been updated to: {new_status}",
-                'type': 'issue_status',
-                'issue_id': issue_id,
-                'status': new_status,
-                'user_id': updated_issue['user_id'],
-                'updated_by': f"{staff_user['name']} ({user_category} Staff)",
-                'created_at': datetime.utcnow().isoformat()
-            })
-        except Exception as e:
-            print(f"Failed to emit user notification: {e}")
+            status_service.transition(issue_id, new_status, user_id, 'staff', category=user_category)
+        except StatusUpdateError as e:
+            return jsonify({'error': e.message}), e.status_code
 
         return jsonify({'message': 'Status updated successfully'}), 200
 
@@ -737,19 +816,17 @@ def staff_update_issue_status():
 
 # Admin Routes
 @app.route('/admin/reports', methods=['GET'])
-@jwt_required()
+@role_required('admin')
 def get_admin_reports():
     try:
-        user_id = get_jwt_identity()
-        user = users_collection.find_one({'_id': ObjectId(user_id)})
-        
-        if not user or user['role'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Get query parameters
         category = request.args.get('category')
         status = request.args.get('status')
         location = request.args.get('location')
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Build query
         query = {}
@@ -757,35 +834,32 @@ def get_admin_reports():
             query['category'] = category
         if status:
             query['status'] = status
-        if location:
-            query['location.address'] = {'$regex': location, '$options': 'i'}
         
-        issues = list(issues_collection.find(query).sort('created_at', -1))
+        # Reporter names/emails are resolved in one batched lookup; location
+        # searches match address word prefixes, newest first
+        issues, next_cursor = list_issues(issues_collection, user_cache, query, include_email=True,
+                                          limit=limit, cursor=cursor, search=location)
         
-        # Add user names and format data
-        for issue in issues:
-            user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-            issue['user_name'] = user['name'] if user else 'Unknown'
-            issue['user_email'] = user['email'] if user else 'Unknown'
-            issue['_id'] = str(issue['_id'])
-            issue['created_at'] = issue['created_at'].isoformat()
-            issue['updated_at'] = issue['updated_at'].isoformat()
-        
-        return jsonify({'issues': issues}), 200
+        return jsonify({'issues': issues, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/stats', methods=['GET'])
+@role_required('admin')
+def get_admin_stats():
+    """Dashboard counters per status and category, served from the counters collection"""
+    try:
+        return jsonify(read_stats(stats_collection, category=request.args.get('category'))), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/update', methods=['POST'])
-@jwt_required()
+@role_required('admin')
 def update_issue_status():
     try:
         user_id = get_jwt_identity()
-        user = users_collection.find_one({'_id': ObjectId(user_id)})
-        
-        if not user or user['role'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         issue_id = data.get('issue_id')
         new_status = data.get('status')
@@ -793,103 +867,10 @@ def update_issue_status():
         if not issue_id or not new_status:
             return jsonify({'error': 'Missing issue_id or status'}), 400
         
-        if new_status not in ['Pending', 'In Progress', 'Resolved']:
-            return jsonify({'error': 'Invalid status'}), 400
-        
-        # Update issue
-        result = issues_collection.update_one(
-            {'_id': ObjectId(issue_id)},
-            {
-                '$set': {
-                    'status': new_status,
-                    'updated_at': datetime.utcnow()
-                }
-            }
-        )
-        
-        if result.matched_count == 0:
-            return jsonify({'error': 'Issue not found'}), 404
-        
-        # Get updated issue for broadcast
-        issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
-        issue_user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-        
-        # Create notification for the issue reporter
-        notification = {
-            'user_id': issue['user_id'],
-            'type': 'issue_status',
-            'title': 'Issue Status Updated',
-            'message': f"Your issue '{issue['title']}' is now {new_status}",
-            'issue_id': issue_id,
-            'status': new_status,
-            'read': False,
-            'created_at': datetime.utcnow()
-        }
-        notifications_collection.insert_one(notification)
-
-        # Send email notification to the issue reporter
-        if issue_user and issue_user.get('email'):
-            email_subject = f"Issue Status Update - {issue['title']}"
-            email_body = f"""
-            <html>
-            <body>
-                <h2>Your Civic Issue Status Has Been Updated</h2>
-                <p>Dear {issue_user['name']},</p>
-
-                <p>We wanted to inform you that the status of your reported issue has been updated:</p>
-
-                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>Issue Details:</h3>
-                    <p><strong>Title:</strong> {issue['title']}</p>
-                    <p><strong>New Status:</strong> <span style="color: #007bff; font-weight: bold;">{new_status}</span></p>
-                    <p><strong>Updated by:</strong> {user['name']} (Administrator)</p>
-                    <p><strong>Date:</strong> {datetime.utcnow().strftime('%B %d, %Y at %I:%M %p')}</p>
-                </div>
-
-                <p>Thank you for helping improve our community by reporting this issue.</p>
-
-                <p>Best regards,<br>
-                Civic Issue Reporting System</p>
-            </body>
-            </html>
-            """
-            send_email_notification(issue_user['email'], email_subject, email_body)
-
-        # Broadcast status update globally (for admins/dashboards)
-        socketio.emit('status_update', {
-            'issue_id': issue_id,
-            'status': new_status,
-            'title': issue['title'],
-            'user_name': issue_user['name'] if issue_user else 'Unknown'
-        })
-
-        # Emit user-targeted notification to the reporter's room
         try:
-            room_name = f"user_{issue['user_id']}"
-            socketio.emit('user_notification', {
-                'title': issue['title'],
-                'message': f"Your issue '{issue['title']}' status has been updated to: {new_status}",
-                'type': 'issue_status',
-                'issue_id': issue_id,
-                'status': new_status,
-                'updated_by': f"{user['name']} (Administrator)",
-                'created_at': datetime.utcnow().isoformat()
-            }, room=room_name)
-
-            # Also emit to all users (for the user's dashboard)
-            socketio.emit('user_notification', {
-                'title': issue['title'],
-                'message': f"Your issue '{issue['title']}' status has been updated to: {new_status}",
-                'type': 'issue_status',
-                'issue_id': issue_id,
-                'status': new_status,
-                'user_id': issue['user_id'],
-                'updated_by': f"{user['name']} (Administrator)",
-                'created_at': datetime.utcnow().isoformat()
-            })
-            print(f"User notification emitted for issue {issue_id}")
-        except Exception as e:
-            print(f"Failed to emit user notification: {e}")
+            status_service.transition(issue_id, new_status, user_id, 'admin')
+        except StatusUpdateError as e:
+            return jsonify({'error': e.message}), e.status_code
         
         return jsonify({'message': 'Status updated successfully'}), 200
         
@@ -897,6 +878,49 @@ def update_issue_status():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/admin/bulk-update', methods=['POST'])
+@role_required('admin')
+def bulk_update_issue_status():
+    """Move many issues to one status in a single write"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        try:
+            updated, skipped = status_service.bulk_transition(data.get('issue_ids'), data.get('status'), user_id, 'admin')
+        except StatusUpdateError as e:
+            return jsonify({'error': e.message}), e.status_code
+
+        return jsonify({'updated': len(updated), 'skipped': skipped}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/staff/bulk-update', methods=['POST'])
+@jwt_required()
+def staff_bulk_update_issue_status():
+    """Move many issues of the staff member's category to one status in a single write"""
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        if claims.get('role') != 'staff':
+            return jsonify({'error': 'Staff access required'}), 403
+        if not claims.get('category'):
+            return jsonify({'error': 'Staff category not found'}), 403
+
+        data = request.get_json() or {}
+        try:
+            updated, skipped = status_service.bulk_transition(data.get('issue_ids'), data.get('status'), user_id,
+                                                              'staff', category=claims['category'])
+        except StatusUpdateError as e:
+            return jsonify({'error': e.message}), e.status_code
+
+        return jsonify({'updated': len(updated), 'skipped': skipped}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # Notification Routes
 @app.route('/notifications', methods=['GET'])
 @jwt_required()
@@ -953,6 +977,14 @@ def health_check():
                 'users': users_count,
                 'issues': issues_count
             },
+            'user_cache': user_cache.stats(),
+            'outbox': outbox_dispatcher.stats(),
+            'mailer': mailer.stats(),
+            'email_digest': email_digest.stats(),
+            'socket_fanout': realtime.stats(),
+            'thumbnails': thumbnails.stats(),
+            'password_hasher': password_hasher.stats(),
+            'revocations': revocations.stats(),
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -966,8 +998,13 @@ def health_check():
 
 # Socket.IO events
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     print('Client connected')
+    # Clients that send their JWT are placed in their own rooms (user, admins, category staff);
+    # those are the only rooms join_room accepts from this socket
+    session['rooms'] = rooms_for_token((auth or {}).get('token'), revocations)
+    for room in session['rooms']:
+        join_room(room)
     emit('connected', {'message': 'Connected to server'})
 
 @socketio.on('disconnect')
@@ -976,7 +1013,10 @@ def handle_disconnect():
 
 @socketio.on('join_room')
 def handle_join_room(data):
-    room = data['room']
+    room = (data or {}).get('room')
+    if room not in session.get('rooms', []):
+        emit('join_refused', {'room': room, 'error': 'Not allowed to join this room'})
+        return
     join_room(room)
     print(f"Client joined room: {room}")
     emit('joined_room', {'room': room})
@@ -987,10 +1027,16 @@ def handle_leave_room(data):
     leave_room(room)
     emit('left_room', {'room': room})
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Upload is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB'}), 413
+
 # Serve uploaded files
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(app.config['UPLOAD_FOLDER'], filename)
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # No reloader: its parent process would import the module and run a second outbox dispatcher,
+    # digest flusher and upload reaper, with no sockets to emit to
+    socketio.run(app, debug=True, use_reloader=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
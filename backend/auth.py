@@ -0,0 +1,117 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt, jwt_required
+
+TOKEN_REVOCATIONS_COLLECTION = 'token_revocations'
+
+
+def role_required(*roles):
+    """Like @jwt_required(), and the token's signed `role` claim must be one of `roles`.
+
+    No user document is loaded: the claim was set at login, and tokens of
+    users whose role changed are rejected through the RevocationList.
+    """
+    message = f"{roles[0].capitalize()} access required"
+
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if get_jwt().get('role') not in roles:
+                return jsonify({'error': message}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RevocationList:
+    """In-memory copy of the token revocations, refreshed from MongoDB every few seconds.
+
+    One document per user records `revoked_before`: tokens issued (iat) before
+    it are refused, which covers role changes, removed accounts and forced
+    logouts. Checking a token is a dict lookup; a revocation made by another
+    worker takes effect here within `refresh_interval` seconds. Entries older
+    than the token lifetime no longer matter and are dropped.
+    """
+
+    def __init__(self, collection, token_lifetime=timedelta(hours=24), refresh_interval=15):
+        self.collection = collection
+        self.token_lifetime = token_lifetime
+        self.refresh_interval = refresh_interval
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._last_seen = None
+        self._thread = None
+        self.refreshed_at = None
+        self.rejected = 0
+
+    def refresh(self):
+        """Load revocations written since the last refresh (with a little overlap for clock skew)"""
+        now = datetime.utcnow()
+        since = now - self.token_lifetime if self._last_seen is None else self._last_seen - timedelta(seconds=5)
+        entries = list(self.collection.find({'updated_at': {'$gte': since}},
+                                            {'revoked_before': 1, 'updated_at': 1}))
+        cutoff = time.time() - self.token_lifetime.total_seconds()
+        with self._lock:
+            for entry in entries:
+                self._revoked[entry['_id']] = entry['revoked_before']
+                if self._last_seen is None or entry['updated_at'] > self._last_seen:
+                    self._last_seen = entry['updated_at']
+            if self._last_seen is None:
+                self._last_seen = now
+            self._revoked = {user_id: before for user_id, before in self._revoked.items() if before > cutoff}
+            self.refreshed_at = now
+
+    def start(self):
+        """Load the list, then keep it fresh on a daemon thread"""
+        if self._thread is not None:
+            return
+        self.refresh()
+
+        def run():
+            while True:
+                time.sleep(self.refresh_interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Token revocation refresh failed: {e}")
+
+        self._thread = threading.Thread(target=run, name='token-revocations', daemon=True)
+        self._thread.start()
+
+    def revoke_user(self, user_id, reason=None):
+        """Refuse every token issued to `user_id` until now; they have to log in again"""
+        user_id = str(user_id)
+        # Whole seconds, like iat; rounding up also covers tokens issued earlier in this second
+        revoked_before = int(time.time()) + 1
+        self.collection.update_one(
+            {'_id': user_id},
+            {'$set': {'revoked_before': revoked_before, 'reason': reason, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+        with self._lock:
+            self._revoked[user_id] = revoked_before
+
+    def is_revoked(self, claims):
+        with self._lock:
+            revoked_before = self._revoked.get(str(claims.get('sub')))
+            revoked = revoked_before is not None and claims.get('iat', 0) < revoked_before
+            if revoked:
+                self.rejected += 1
+        return revoked
+
+    def install(self, jwt):
+        """Refuse revoked tokens on every @jwt_required route of the app owning `jwt`"""
+        jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: self.is_revoked(jwt_payload))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._revoked),
+                'rejected': self.rejected,
+                'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None
+            }
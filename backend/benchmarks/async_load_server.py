@@ -0,0 +1,48 @@
+"""
+Minimal Socket.IO server for bench_async_modes.py, started once per async mode.
+
+/work stands in for a handler's blocking I/O (a MongoDB query or an SMTP
+send) by sleeping `WORK_MS`; under eventlet/gevent the sleep is cooperative,
+exactly like the patched pymongo and smtplib calls in the real apps.
+
+Usage (from backend/):
+    python benchmarks/async_load_server.py MODE PORT
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serve import monkey_patch  # noqa: E402
+
+MODE, PORT = sys.argv[1], int(sys.argv[2])
+monkey_patch(MODE)
+
+import time  # noqa: E402
+
+from flask import Flask, jsonify  # noqa: E402
+from flask_socketio import join_room  # noqa: E402
+
+from realtime import create_socketio  # noqa: E402
+
+WORK_MS = 20
+
+app = Flask(__name__)
+socketio = create_socketio(app, async_mode=MODE)
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    join_room('load_test')
+
+
+@app.route('/work')
+def work():
+    time.sleep(WORK_MS / 1000)
+    return jsonify({'ok': True})
+
+
+if __name__ == '__main__':
+    options = {'allow_unsafe_werkzeug': True} if MODE == 'threading' else {}
+    socketio.run(app, host='127.0.0.1', port=PORT, debug=False, log_output=False, **options)
@@ -0,0 +1,55 @@
+"""
+Address search benchmark: unanchored case-insensitive $regex (the previous
+/admin/reports and /staff/reports implementation) vs the address word-prefix
+search in listing.search_query.
+
+Usage (from backend/):
+    python benchmarks/bench_address_search.py [issue count]
+"""
+
+import sys
+
+from bench_common import connect_bench_db, seed_issues, seed_users, timed
+from common import ensure_indexes
+from listing import LISTING_SORT, search_query
+
+SEARCHES = ['Main Street', 'Lake', 'Ward 42', 'Temple', 'Mai']
+
+
+def regex_search(issues_collection, location, limit):
+    query = {'location.address': {'$regex': location, '$options': 'i'}}
+    return list(issues_collection.find(query).sort(LISTING_SORT).limit(limit))
+
+
+def docs_examined(cursor):
+    return cursor.explain()['executionStats']['totalDocsExamined']
+
+
+def main(count):
+    client, db, _ = connect_bench_db()
+    issues_collection = db['issues']
+    ensure_indexes(db)
+    user_ids = seed_users(db['users'], 500)
+    print(f"Seeding {count} issues...")
+    seed_issues(issues_collection, user_ids, count)
+
+    limit = 50
+    print(f"{'search':<14} | {'regex ms':>9} | {'regex docs':>10} | {'prefix ms':>9} | {'prefix docs':>11}")
+    print('-' * 65)
+    for location in SEARCHES:
+        regex_ms, _ = timed(lambda: regex_search(issues_collection, location, limit))
+        regex_docs = docs_examined(
+            issues_collection.find({'location.address': {'$regex': location, '$options': 'i'}})
+            .sort(LISTING_SORT).limit(limit))
+
+        prefix_query = search_query({}, location)
+        prefix_ms, _ = timed(lambda: list(issues_collection.find(prefix_query).sort(LISTING_SORT).limit(limit)))
+        prefix_docs = docs_examined(issues_collection.find(prefix_query).sort(LISTING_SORT).limit(limit))
+
+        print(f"{location:<14} | {regex_ms:>9.1f} | {regex_docs:>10} | {prefix_ms:>9.1f} | {prefix_docs:>11}")
+
+    client.drop_database(db.name)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,124 @@
+"""
+Async mode load test: for each server mode (threading, eventlet, gevent --
+whichever are installed) start benchmarks/async_load_server.py, hold
+`connections` idle websockets open against it, then measure HTTP latency of
+`requests` calls to an I/O-bound handler while those sockets stay connected.
+
+Reports how many websockets the server accepted and the p50/p99 latency of
+the handler under that load. Needs no MongoDB.
+
+Usage (from backend/):
+    python benchmarks/bench_async_modes.py [connections] [requests] [concurrency]
+"""
+
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import simple_websocket
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, 'async_load_server.py')
+
+
+def installed_modes():
+    modes = ['threading']
+    for mode in ('eventlet', 'gevent'):
+        if importlib.util.find_spec(mode):
+            modes.append(mode)
+    return modes
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/work', timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def open_socket(port):
+    """Engine.IO v4 websocket handshake plus the Socket.IO namespace connect; None on failure"""
+    try:
+        ws = simple_websocket.Client(f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket')
+        if not str(ws.receive(timeout=10)).startswith('0'):
+            ws.close()
+            return None
+        ws.send('40')
+        if not str(ws.receive(timeout=10)).startswith('40'):
+            ws.close()
+            return None
+        return ws
+    except Exception:
+        return None
+
+
+def timed_request(session_url):
+    start = time.perf_counter()
+    try:
+        requests.get(session_url, timeout=30).raise_for_status()
+        return (time.perf_counter() - start) * 1000
+    except requests.RequestException:
+        return None
+
+
+def run_mode(mode, connections, request_count, concurrency):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, SERVER, mode, str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    sockets = []
+    try:
+        if not wait_for_server(port):
+            print(f"{mode:<10} | server did not start")
+            return
+        with ThreadPoolExecutor(max_workers=100) as pool:
+            sockets = [ws for ws in pool.map(lambda _: open_socket(port), range(connections)) if ws]
+
+        url = f'http://127.0.0.1:{port}/work'
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(ms for ms in pool.map(lambda _: timed_request(url), range(request_count)) if ms)
+        elapsed = time.perf_counter() - start
+        if not latencies:
+            print(f"{mode:<10} | {len(sockets):>9} | all requests failed")
+            return
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        print(f"{mode:<10} | {len(sockets):>9} | {len(latencies):>8} | {len(latencies) / elapsed:>7.0f} | "
+              f"{p50:>7.1f} | {p99:>7.1f}")
+    finally:
+        for ws in sockets:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        server.terminate()
+        server.wait()
+
+
+def main(connections, request_count, concurrency):
+    print(f"{connections} idle websockets, {request_count} requests at concurrency {concurrency}")
+    print(f"{'mode':<10} | {'connected':>9} | {'requests':>8} | {'req/s':>7} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print('-' * 64)
+    for mode in installed_modes():
+        run_mode(mode, connections, request_count, concurrency)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 50)
@@ -0,0 +1,107 @@
+"""
+Shared helpers for the backend benchmarks.
+
+Benchmarks run against a real MongoDB on localhost and use a scratch
+database (civic_issues_bench) that is dropped before seeding, so they never
+touch the application data.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, monitoring
+
+# Let benchmarks import the backend modules (listing, common, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import address_prefixes  # noqa: E402
+
+BENCH_DB_NAME = 'civic_issues_bench'
+CATEGORIES = ['Roads', 'Water', 'Electricity', 'Sanitation', 'Other']
+STATUSES = ['Pending', 'In Progress', 'Resolved']
+STREETS = ['Main Street', 'Park Avenue', 'Lake Road', 'Hill View', 'Station Road',
+           'Market Lane', 'Temple Street', 'Ring Road', 'College Road', 'Bridge Street']
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to MongoDB (one command == one round-trip)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.count = 0
+
+
+def connect_bench_db():
+    """Return (client, db, counter) for a freshly dropped benchmark database"""
+    counter = CommandCounter()
+    client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000,
+                         event_listeners=[counter])
+    client.admin.command('ping')
+    client.drop_database(BENCH_DB_NAME)
+    return client, client[BENCH_DB_NAME], counter
+
+
+def seed_users(users_collection, count):
+    result = users_collection.insert_many([
+        {'name': f'User {i}', 'email': f'user{i}@example.com', 'password': 'x',
+         'role': 'user', 'created_at': datetime.utcnow()}
+        for i in range(count)
+    ])
+    return [str(_id) for _id in result.inserted_ids]
+
+
+def seed_issues(issues_collection, user_ids, count, batch_size=5000):
+    """Insert `count` synthetic issues spread over the last year"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        address = f'{rng.randint(1, 999)} {rng.choice(STREETS)}, Ward {rng.randint(1, 80)}'
+        batch.append({
+            'user_id': rng.choice(user_ids),
+            'title': f'Issue {i}',
+            'description': 'Synthetic benchmark issue',
+            'category': rng.choice(CATEGORIES),
+            'status': rng.choice(STATUSES),
+            'image': None,
+            'location': {
+                'latitude': 12.9 + rng.random() * 0.2,
+                'longitude': 77.5 + rng.random() * 0.2,
+                'address': address,
+                'address_prefixes': address_prefixes(address)
+            },
+            'created_at': created,
+            'updated_at': created
+        })
+        if len(batch) >= batch_size:
+            issues_collection.insert_many(batch)
+            batch = []
+    if batch:
+        issues_collection.insert_many(batch)
+
+
+def timed(fn, repeat=3):
+    """Run fn `repeat` times and return (best_ms, last_result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
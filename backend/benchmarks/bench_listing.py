@@ -0,0 +1,64 @@
+"""
+Issue listing benchmark: per-issue reporter lookup (N+1) vs the batched
+listing pipeline in listing.py.
+
+Usage (from backend/):
+    python benchmarks/bench_listing.py [issue counts...]
+"""
+
+import sys
+
+from bson import ObjectId
+
+from bench_common import connect_bench_db, seed_issues, seed_users, timed
+from cache import UserProfileCache
+from listing import list_issues
+
+
+def naive_listing(issues_collection, users_collection):
+    """The pre-batching implementation: one users.find_one per issue"""
+    issues = list(issues_collection.find({}).sort('created_at', -1))
+    for issue in issues:
+        user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
+        issue['user_name'] = user['name'] if user else 'Unknown'
+        issue['user_email'] = user['email'] if user else 'Unknown'
+        issue['_id'] = str(issue['_id'])
+        issue['created_at'] = issue['created_at'].isoformat()
+        issue['updated_at'] = issue['updated_at'].isoformat()
+    return issues
+
+
+def main(sizes):
+    client, db, counter = connect_bench_db()
+    users_collection = db['users']
+    issues_collection = db['issues']
+    user_ids = seed_users(users_collection, 500)
+
+    print(f"{'issues':>8} | {'N+1 trips':>9} | {'N+1 ms':>9} | {'batched trips':>13} | {'batched ms':>10}")
+    print('-' * 62)
+    seeded = 0
+    for size in sizes:
+        seed_issues(issues_collection, user_ids, size - seeded)
+        seeded = size
+
+        counter.reset()
+        naive_listing(issues_collection, users_collection)
+        naive_trips = counter.count
+        naive_ms, _ = timed(lambda: naive_listing(issues_collection, users_collection), repeat=1)
+
+        # A fresh (cold) profile cache per run so the batched user query is measured too
+        def batched_listing():
+            return list_issues(issues_collection, UserProfileCache(users_collection), {}, include_email=True)[0]
+
+        counter.reset()
+        batched_listing()
+        batched_trips = counter.count
+        batched_ms, _ = timed(batched_listing)
+
+        print(f"{size:>8} | {naive_trips:>9} | {naive_ms:>9.1f} | {batched_trips:>13} | {batched_ms:>10.1f}")
+
+    client.drop_database(db.name)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000, 20000])
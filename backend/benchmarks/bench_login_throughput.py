@@ -0,0 +1,147 @@
+"""
+Login throughput benchmark: check_password_hash on the request thread (the
+previous /login) vs passwords.PasswordHasher's process pool.
+
+A threaded Werkzeug server handles a burst of concurrent logins while a
+probe client keeps requesting a cheap endpoint, standing in for the
+listing and websocket traffic that shares the worker. Reported: logins per
+second, login latency, and how long the cheap requests stall. A last run
+starts from hashes made with a lower cost, exercising the transparent
+rehash on login. No MongoDB is needed.
+
+Usage (from backend/):
+    python benchmarks/bench_login_throughput.py [seconds] [concurrency] [method]
+"""
+
+import logging
+import statistics
+import sys
+import threading
+import time
+
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.serving import make_server
+
+import bench_common  # noqa: F401  (puts backend/ on sys.path)
+from passwords import DEFAULT_METHOD, PasswordHasher, authenticate
+
+USERS = 50
+PASSWORD = 'correct horse battery staple'
+
+
+class InMemoryUsers:
+    """Just the two users-collection calls the login path makes"""
+
+    def __init__(self, method):
+        stored = generate_password_hash(PASSWORD, method=method)
+        self.users = {f'user{i}@example.com': {'_id': i, 'email': f'user{i}@example.com', 'password': stored}
+                      for i in range(USERS)}
+        self._lock = threading.Lock()
+
+    def find_one(self, query):
+        user = self.users.get(query['email'])
+        return dict(user) if user else None
+
+    def update_one(self, query, update):
+        with self._lock:
+            for user in self.users.values():
+                if user['_id'] == query['_id'] and user['password'] == query['password']:
+                    user.update(update['$set'])
+
+
+def make_app(users, hasher):
+    app = Flask(__name__)
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        data = request.get_json()
+        if hasher is None:
+            user = users.find_one({'email': data['email']})
+            ok = user is not None and check_password_hash(user['password'], data['password'])
+        else:
+            ok = authenticate(users, hasher, data['email'], data['password']) is not None
+        return (jsonify({'message': 'Login successful'}), 200) if ok else (jsonify({'error': 'Invalid'}), 401)
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'ok': True})
+
+    return app
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(label, app, seconds, concurrency):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    deadline = time.monotonic() + seconds
+    login_latencies, ping_latencies, failures = [], [], []
+
+    def login_client(index):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            response = session.post(f'{base}/login', json={'email': f'user{index % USERS}@example.com',
+                                                             'password': PASSWORD})
+            if response.status_code == 200:
+                login_latencies.append(time.perf_counter() - start)
+            else:
+                failures.append(response.status_code)
+
+    def probe():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            session.get(f'{base}/ping')
+            ping_latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=login_client, args=(i,)) for i in range(concurrency)]
+    threads.append(threading.Thread(target=probe))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    print(f"{label:<28} {len(login_latencies) / elapsed:>9.1f} {percentile(login_latencies, 50) * 1000:>9.0f}"
+          f" {percentile(login_latencies, 99) * 1000:>9.0f} {statistics.median(ping_latencies) * 1000:>9.1f}"
+          f" {percentile(ping_latencies, 99) * 1000:>9.1f} {len(failures):>6}")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    method = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_METHOD
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    print(f"{concurrency} concurrent logins for {seconds:.0f}s, {method}\n")
+    print(f"{'mode':<28} {'logins/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'ping p50':>9} {'ping p99':>9} {'fails':>6}")
+    run('inline (request thread)', make_app(InMemoryUsers(method), None), seconds, concurrency)
+    for workers in (2, 4):
+        hasher = PasswordHasher(method=method, workers=workers)
+        run(f'process pool, {workers} workers', make_app(InMemoryUsers(method), hasher), seconds, concurrency)
+
+    # Stored hashes made with a lower cost, as if PASSWORD_HASH_METHOD had just been raised
+    old_method = 'pbkdf2:sha256:260000'
+    hasher = PasswordHasher(method=method, workers=2)
+    users = InMemoryUsers(old_method)
+    run('pool, rehash from 260000', make_app(users, hasher), seconds, concurrency)
+    upgraded = sum(1 for user in users.users.values() if user['password'].startswith(hasher.method + '$'))
+    print(f"\nrehashed on login: {hasher.stats()['rehashed']}, users now on {method}: {upgraded} of {USERS}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Email delivery benchmark: the previous thread-per-email sender (new SMTP
+connection per message) vs mailer.PooledMailer (bounded queue, reused
+connections), both against a local stand-in SMTP server.
+
+The stand-in accepts every message and sleeps `handshake_ms` when a client
+connects, standing in for the TCP + STARTTLS + login cost of a real relay.
+No MongoDB is needed.
+
+Usage (from backend/):
+    python benchmarks/bench_mailer.py [emails] [handshake_ms]
+"""
+
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import bench_common  # noqa: F401  (puts backend/ on sys.path)
+from mailer import PooledMailer
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.sendmail: greets, accepts DATA, counts messages"""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.server.connections += 1
+        time.sleep(self.server.handshake_ms / 1000)
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-stand-in')
+                self.reply('250 SIZE 10485760')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages += 1
+                self.reply('250 OK queued')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                # HELO, MAIL FROM, RCPT TO, RSET, NOOP
+                self.reply('250 OK')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # The thread-per-email path connects all at once
+    request_queue_size = 1024
+
+    def __init__(self, handshake_ms):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.handshake_ms = handshake_ms
+        self.connections = 0
+        self.messages = 0
+
+
+def legacy_send(config, to_email, subject, body):
+    """The previous send_email_notification: one thread and one SMTP session per email"""
+    def send_email():
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = config['EMAIL_ADDRESS']
+            msg['To'] = to_email
+            msg['Subject'] = subject
+            msg.attach(MIMEText(body, 'html'))
+            server = smtplib.SMTP(config['SMTP_SERVER'], config['SMTP_PORT'])
+            server.sendmail(config['EMAIL_ADDRESS'], to_email, msg.as_string())
+            server.quit()
+        except Exception as e:
+            print(f"legacy send failed: {e}")
+
+    thread = threading.Thread(target=send_email)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def run(label, server, send_all):
+    server.connections = 0
+    server.messages = 0
+    start = time.perf_counter()
+    peak_threads = send_all()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} | {server.messages:>8} | {server.connections:>11} | {peak_threads:>12} | {elapsed:>8.2f}")
+
+
+def main(emails, handshake_ms):
+    server = StandInSMTPServer(handshake_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = {'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': server.server_address[1],
+              'EMAIL_ADDRESS': 'bench@example.com', 'EMAIL_PASSWORD': '', 'USE_TLS': False}
+    body = '<html><body><p>Your issue status has been updated.</p></body></html>'
+
+    def send_legacy():
+        threads = [legacy_send(config, f'user{i}@example.com', 'Status update', body) for i in range(emails)]
+        peak = threading.active_count()
+        for thread in threads:
+            thread.join()
+        return peak
+
+    def send_pooled():
+        mailer = PooledMailer(config, workers=4, max_queue=emails)
+        for i in range(emails):
+            mailer.send(f'user{i}@example.com', 'Status update', body)
+        peak = threading.active_count()
+        mailer.wait_until_empty()
+        mailer.stop()
+        return peak
+
+    print(f"{'path':<18} | {'messages':>8} | {'connections':>11} | {'peak threads':>12} | {'seconds':>8}")
+    print('-' * 70)
+    run('thread per email', server, send_legacy)
+    run('pooled mailer', server, send_pooled)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
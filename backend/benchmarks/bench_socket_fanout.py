@@ -0,0 +1,123 @@
+"""
+Socket.IO fan-out benchmark: the previous status update broadcasts
+(status_update, issue_updated and user_notification to every client, plus
+the reporter's room) vs realtime.RealtimeDelivery (reporter room, category
+staff and admins only).
+
+Clients are simulated in-process with Flask-SocketIO test clients that
+authenticate with a JWT like the frontend does; 1% are admins, 5% staff
+spread over the categories and the rest reporters. No MongoDB is needed.
+
+Usage (from backend/):
+    python benchmarks/bench_socket_fanout.py [clients] [updates]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from flask_socketio import SocketIO, join_room
+
+from bench_common import CATEGORIES, STATUSES
+from realtime import RealtimeDelivery, rooms_for_token
+
+
+def legacy_broadcast(socketio, transition):
+    """The previous broadcast_transition for a single update"""
+    issue = transition['issue']
+    socketio.emit('status_update', {
+        'issue_id': transition['issue_id'], 'status': transition['status'], 'title': issue['title'],
+        'user_name': transition['reporter']['name'], 'updated_by': transition['updated_by']
+    })
+    socketio.emit('issue_updated', {
+        'issue_id': transition['issue_id'], 'status': transition['status'], 'category': issue['category'],
+        'updated_by': transition['actor_role']
+    })
+    user_notification = {
+        'title': issue['title'],
+        'message': f"Your issue '{issue['title']}' status has been updated to: {transition['status']}",
+        'type': 'issue_status', 'issue_id': transition['issue_id'], 'status': transition['status'],
+        'updated_by': transition['updated_by'], 'created_at': transition['updated_at'].isoformat()
+    }
+    socketio.emit('user_notification', user_notification, room=f"user_{issue['user_id']}")
+    socketio.emit('user_notification', {**user_notification, 'user_id': issue['user_id']})
+
+
+def make_transition(rng, reporter_ids):
+    issue_id = str(ObjectId())
+    return {
+        'issue_id': issue_id,
+        'issue': {'_id': issue_id, 'title': f'Issue {issue_id[-6:]}', 'user_id': rng.choice(reporter_ids),
+                  'category': rng.choice(CATEGORIES)},
+        'status': rng.choice(STATUSES),
+        'previous_status': 'Pending',
+        'reporter': {'name': 'Reporter'},
+        'actor_role': 'staff',
+        'updated_by': 'Crew (Roads Staff)',
+        'updated_at': datetime.utcnow()
+    }
+
+
+def run(label, clients, transitions, deliver):
+    for client in clients:
+        client.get_received()
+    start = time.perf_counter()
+    for transition in transitions:
+        deliver(transition)
+    elapsed = (time.perf_counter() - start) * 1000
+    frames = 0
+    payload_bytes = 0
+    for client in clients:
+        received = client.get_received()
+        frames += len(received)
+        payload_bytes += sum(len(repr(message['args'])) for message in received)
+    per_update = len(transitions)
+    print(f"{label:<10} | {frames / per_update:>13.1f} | {payload_bytes / per_update / 1024:>12.1f} | "
+          f"{elapsed / per_update:>9.2f}")
+
+
+def main(client_count, updates):
+    rng = random.Random(7)
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'benchmark-only-secret-key-of-32-bytes+'
+    JWTManager(app)
+    socketio = SocketIO(app, async_mode='threading')
+    realtime = RealtimeDelivery(socketio)
+
+    @socketio.on('connect')
+    def handle_connect(auth=None):
+        for room in rooms_for_token((auth or {}).get('token')):
+            join_room(room)
+
+    reporter_ids = []
+    clients = []
+    with app.app_context():
+        for i in range(client_count):
+            user_id = str(ObjectId())
+            roll = rng.random()
+            if roll < 0.01:
+                claims = {'role': 'admin'}
+            elif roll < 0.06:
+                claims = {'role': 'staff', 'category': rng.choice(CATEGORIES)}
+            else:
+                claims = {'role': 'user'}
+                reporter_ids.append(user_id)
+            token = create_access_token(identity=user_id, additional_claims=claims)
+            clients.append(socketio.test_client(app, auth={'token': token}))
+
+    transitions = [make_transition(rng, reporter_ids) for _ in range(updates)]
+    print(f"{client_count} clients, {updates} status updates")
+    print(f"{'path':<10} | {'frames/update':>13} | {'KiB/update':>12} | {'ms/update':>9}")
+    print('-' * 54)
+    run('broadcast', clients, transitions, lambda transition: legacy_broadcast(socketio, transition))
+    run('targeted', clients, transitions, lambda transition: realtime.status_changed([transition]))
+    print(f"\nfan-out counters: {realtime.stats()}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,80 @@
+"""
+Status update benchmark: the previous per-route sequence (find_one, update_one,
+find_one, two user find_ones, notification insert) vs
+IssueStatusService.transition (single find_one_and_update with the category
+guard in the filter, one counters bulk write and one outbox insert;
+notifications are left to the outbox dispatcher, which is not started here).
+
+Side effects (email, sockets) are excluded from both paths so only the
+request-path database work is compared.
+
+Usage (from backend/):
+    python benchmarks/bench_status_update.py [updates]
+"""
+
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from bench_common import STATUSES, connect_bench_db, seed_issues, seed_users
+from cache import UserProfileCache
+from outbox import OUTBOX_COLLECTION, Outbox
+from stats import STATS_COLLECTION, rebuild_stats
+from status_service import IssueStatusService
+
+
+def legacy_update(db, issue_id, new_status, staff_id, category):
+    issues_collection = db['issues']
+    users_collection = db['users']
+    issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
+    if not issue or issue['category'] != category:
+        return
+    issues_collection.update_one({'_id': ObjectId(issue_id)}, {'$set': {
+        'status': new_status, 'updated_at': datetime.utcnow(), 'updated_by': staff_id, 'updated_by_role': 'staff'}})
+    updated_issue = issues_collection.find_one({'_id': ObjectId(issue_id)})
+    users_collection.find_one({'_id': ObjectId(updated_issue['user_id'])})
+    users_collection.find_one({'_id': ObjectId(staff_id)})
+    db['notifications'].insert_one({'user_id': updated_issue['user_id'], 'type': 'issue_status',
+                                    'issue_id': issue_id, 'status': new_status, 'read': False,
+                                    'created_at': datetime.utcnow()})
+
+
+def run(label, update, issues, counter):
+    latencies = []
+    counter.reset()
+    for i, issue in enumerate(issues):
+        start = time.perf_counter()
+        update(str(issue['_id']), STATUSES[i % len(STATUSES)], issue['category'])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<22} | {counter.count / len(issues):>11.1f} | {statistics.mean(latencies):>8.2f} | {p95:>8.2f}")
+
+
+def main(updates):
+    client, db, counter = connect_bench_db()
+    user_ids = seed_users(db['users'], 200)
+    staff_id = user_ids[0]
+    seed_issues(db['issues'], user_ids, updates * 2)
+    rebuild_stats(db['issues'], db[STATS_COLLECTION])
+    issues = list(db['issues'].find({}, {'category': 1}))
+
+    service = IssueStatusService(db['issues'], db['notifications'], db[STATS_COLLECTION],
+                                 UserProfileCache(db['users']), Outbox(db[OUTBOX_COLLECTION], origin='bench'))
+
+    print(f"{'path':<22} | {'trips/update':>11} | {'mean ms':>8} | {'p95 ms':>8}")
+    print('-' * 58)
+    run('legacy (per route)', lambda issue_id, status, category: legacy_update(db, issue_id, status, staff_id, category),
+        issues[:updates], counter)
+    run('status service', lambda issue_id, status, category: service.transition(issue_id, status, staff_id, 'staff',
+                                                                                category=category),
+        issues[updates:], counter)
+
+    client.drop_database(db.name)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,101 @@
+"""
+/uploads serving benchmark: the previous plain send_from_directory route vs
+uploads.serve_upload, in direct mode and with UPLOADS_OFFLOAD=x-accel.
+
+Each scenario replays requests through the WSGI app in-process and reads the
+whole response body, as a server worker would when writing it to the socket,
+and reports worker CPU time per request and the bytes Python had to move.
+"Repeat view" is a browser showing an image it has already loaded: before,
+Cache-Control: no-cache makes it revalidate every time; after, the immutable
+max-age means no request is made at all. No MongoDB is needed.
+
+Usage (from backend/):
+    python benchmarks/bench_upload_serving.py [requests] [image_kb]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask, send_from_directory
+
+import bench_common  # noqa: F401  (puts backend/ on sys.path)
+from uploads import serve_upload
+
+
+def make_app(folder, offload=None):
+    app = Flask(__name__)
+    app.config['UPLOADS_OFFLOAD'] = offload
+    app.config['UPLOADS_ACCEL_PREFIX'] = '/_uploads/'
+
+    @app.route('/before/<path:filename>')
+    def before(filename):
+        return send_from_directory(folder, filename)
+
+    @app.route('/after/<path:filename>')
+    def after(filename):
+        return serve_upload(folder, filename)
+
+    return app
+
+
+def run(client, path, requests, headers=None):
+    """(CPU microseconds per request, body bytes per request, status code)"""
+    moved = 0
+    status = None
+    start = time.process_time()
+    for _ in range(requests):
+        response = client.get(path, headers=headers or {}, buffered=False)
+        for chunk in response.response:
+            moved += len(chunk)
+        response.close()
+        status = response.status_code
+    elapsed = time.process_time() - start
+    return elapsed / requests * 1e6, moved // requests, status
+
+
+def etag_of(client, path):
+    return client.get(path).headers['ETag']
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    image_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+
+    folder = tempfile.mkdtemp(prefix='bench-uploads-')
+    filename = 'a' * 64 + '.jpg'
+    with open(os.path.join(folder, filename), 'wb') as f:
+        f.write(os.urandom(image_kb * 1024))
+
+    direct = make_app(folder).test_client()
+    accel = make_app(folder, offload='x-accel').test_client()
+    before_path, after_path = f'/before/{filename}', f'/after/{filename}'
+
+    scenarios = [
+        ('first view     before (send_from_directory)', direct, before_path, None),
+        ('first view     after, direct', direct, after_path, None),
+        ('first view     after, x-accel', accel, after_path, None),
+        ('repeat view    before (revalidation, 304)', direct, before_path,
+         {'If-None-Match': etag_of(direct, before_path)}),
+        ('range 64 KB    before', direct, before_path, {'Range': 'bytes=0-65535'}),
+        ('range 64 KB    after, direct', direct, after_path, {'Range': 'bytes=0-65535'}),
+        ('range 64 KB    after, x-accel (proxy slices)', accel, after_path, {'Range': 'bytes=0-65535'}),
+    ]
+
+    print(f"{requests} requests per scenario, {image_kb} KB image\n")
+    print(f"{'scenario':<48} {'status':>6} {'CPU us/req':>11} {'bytes/req':>10}")
+    for label, client, path, headers in scenarios:
+        cpu_us, moved, status = run(client, path, requests, headers)
+        print(f"{label:<48} {status:>6} {cpu_us:>11.0f} {moved:>10}")
+    print(f"{'repeat view    after (immutable, browser cache)':<48} {'-':>6} {0:>11} {0:>10}")
+
+    response = direct.get(after_path)
+    print(f"\nafter, direct:  Cache-Control: {response.headers['Cache-Control']}  ETag: {response.headers['ETag']}")
+    response = accel.get(after_path)
+    print(f"after, x-accel: X-Accel-Redirect: {response.headers['X-Accel-Redirect']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Message queue check: two user servers and a write-only emitter (as admin_app
+uses) share the in-process local:// queue, like workers behind a real broker.
+
+Checks that a room emit from either the emitter or the other server reaches
+a client connected to the second server only, and that an ISSUE_CACHE_EVENT
+published by one server runs the handler once in each server. No MongoDB or
+broker is needed.
+
+Usage (from backend/):
+    python benchmarks/check_message_queue.py
+"""
+
+import socket
+import sys
+import threading
+import time
+
+import socketio as python_socketio
+from flask import Flask
+from flask_socketio import join_room
+
+import bench_common  # noqa: F401  (puts backend/ on sys.path)
+from realtime import ISSUE_CACHE_EVENT, RealtimeDelivery, create_socketio, user_room
+
+QUEUE_URL = 'local://'
+REPORTER_ID = 'reporter-1'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name):
+    """A user-server stand-in on the shared queue; every socket joins the reporter's room"""
+    app = Flask(name)
+    socketio = create_socketio(app, message_queue=QUEUE_URL)
+
+    @socketio.on('connect')
+    def handle_connect(auth=None):
+        join_room(user_room(REPORTER_ID))
+
+    port = free_port()
+    threading.Thread(target=socketio.run, args=(app,), daemon=True,
+                     kwargs={'port': port, 'use_reloader': False, 'allow_unsafe_werkzeug': True}).start()
+    return socketio, port
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def main():
+    socketio_a, _ = start_server('worker_a')
+    socketio_b, port_b = start_server('worker_b')
+    delivery_a = RealtimeDelivery(socketio_a)
+    delivery_b = RealtimeDelivery(socketio_b)
+    emitter = RealtimeDelivery(create_socketio(message_queue=QUEUE_URL))
+
+    handled = {'a': [], 'b': []}
+    delivery_a.on_app_event(ISSUE_CACHE_EVENT, handled['a'].append)
+    delivery_b.on_app_event(ISSUE_CACHE_EVENT, handled['b'].append)
+
+    # The reporter is connected to worker B only
+    received = []
+    client = python_socketio.Client()
+    client.on('*', lambda event, data: received.append((event, data['issue_id'])))
+    client.connect(f'http://127.0.0.1:{port_b}', transports=['polling'], wait_timeout=10)
+
+    results = []
+    emitter.emit('notification', {'issue_id': 'from-emitter'}, [user_room(REPORTER_ID)])
+    results.append(check('write-only emitter reaches a room member on worker B',
+                         wait_until(lambda: ('notification', 'from-emitter') in received)))
+
+    delivery_a.emit('status_update', {'issue_id': 'from-a'}, [user_room(REPORTER_ID)])
+    results.append(check('worker A reaches a room member on worker B',
+                         wait_until(lambda: ('status_update', 'from-a') in received)))
+
+    delivery_a.emit('status_update', {'issue_id': 'other-room'}, [user_room('someone-else')])
+    results.append(check('emits to other rooms are not delivered',
+                         not wait_until(lambda: ('status_update', 'other-room') in received, timeout=0.5)))
+
+    data = {'category': 'Roads', 'statuses': ['Pending']}
+    delivery_a.publish_app_event(ISSUE_CACHE_EVENT, data)
+    wait_until(lambda: handled['b'])
+    time.sleep(0.2)
+    results.append(check(f'{ISSUE_CACHE_EVENT} runs once in the publishing worker', handled['a'] == [data]))
+    results.append(check(f'{ISSUE_CACHE_EVENT} runs once in the other worker', handled['b'] == [data]))
+    results.append(check(f'{ISSUE_CACHE_EVENT} is not sent to clients',
+                         all(event != ISSUE_CACHE_EVENT for event, _ in received)))
+
+    client.disconnect()
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+
+import requests
+
+
+class BridgeQueueFull(Exception):
+    """The bridge queue is full; the caller should retry later"""
+
+
+class BridgeDeliveryFailed(Exception):
+    """The user service did not acknowledge the events; the caller should retry later"""
+
+
+class _Delivery:
+    """Events handed over by one send() call; `done` runs once they are all acknowledged or one failed"""
+
+    def __init__(self, count, done):
+        self.pending = count
+        self.done = done
+        self.finished = False
+
+
+class NotificationBridge:
+    """Background sender of user notifications from admin_app to the user service.
+
+    `send()` only enqueues, so the caller never waits on the user service. A
+    single worker drains the bounded queue in batches of up to `batch_size`
+    events, taken from any number of sends, and POSTs them to
+    `/internal/emit_batch` over one persistent requests.Session. Each send's
+    `done` callback reports the outcome: done() once all its events are
+    acknowledged, done(BridgeDeliveryFailed) if a batch failed after
+    `max_attempts`, which lets the outbox retry them instead of dropping them.
+    """
+
+    def __init__(self, base_url, max_queue=5000, batch_size=200, flush_interval=0.05, timeout=2,
+                 max_attempts=3, retry_backoff=0.5):
+        self.url = f"{base_url}/internal/emit_batch"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.delivered = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_latency_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-bridge', daemon=True)
+                self._thread.start()
+
+    def send(self, events, done=None):
+        """Queue events without blocking; raises BridgeQueueFull if there is no room for all of them"""
+        if not events:
+            if done:
+                done()
+            return
+        self.start()
+        # All or nothing, so a retried outbox event doesn't deliver its first half twice
+        if self._queue.maxsize - self._queue.qsize() < len(events):
+            with self._lock:
+                self.rejected += len(events)
+            raise BridgeQueueFull(f'Notification bridge queue is full ({self._queue.maxsize} events)')
+        delivery = _Delivery(len(events), done)
+        for event in events:
+            self._queue.put_nowait((event, delivery))
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        # Linger briefly so a burst of updates goes out as one request
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            events = [event for event, _ in batch]
+            for attempt in range(1, self.max_attempts + 1):
+                start = time.perf_counter()
+                try:
+                    response = self._session.post(self.url, json={'events': events}, timeout=self.timeout)
+                    response.raise_for_status()
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        with self._lock:
+                            self.failed += len(batch)
+                        print(f"Failed to deliver {len(batch)} notification(s) to the user service: {e}")
+                        self._report(batch, BridgeDeliveryFailed(f'User service unavailable: {e}'))
+                    else:
+                        time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                    continue
+                with self._lock:
+                    self.delivered += len(batch)
+                    self.batches += 1
+                    self.last_latency_ms = (time.perf_counter() - start) * 1000
+                self._report(batch, None)
+                break
+
+    def _report(self, batch, error):
+        """Call back each send once all its events are acknowledged, or at its first failure"""
+        finished = []
+        with self._lock:
+            for _, delivery in batch:
+                if delivery.finished:
+                    continue
+                delivery.pending -= 1
+                if error is not None or delivery.pending == 0:
+                    delivery.finished = True
+                    finished.append(delivery)
+        for delivery in finished:
+            if delivery.done is None:
+                continue
+            try:
+                delivery.done(error)
+            except Exception as e:
+                print(f"Notification bridge callback failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'delivered': self.delivered,
+                'batches': self.batches,
+                'avg_batch_size': round(self.delivered / self.batches, 1) if self.batches else 0.0,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'last_latency_ms': round(self.last_latency_ms, 2)
+            }
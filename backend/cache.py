@@ -0,0 +1,197 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Response, request
+
+# Only the profile fields handlers need; never the password hash
+USER_PROFILE_PROJECTION = {'name': 1, 'email': 1, 'role': 1, 'category': 1}
+
+
+class LRUCache:
+    """Thread-safe, size-bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drop every entry whose key matches predicate(key); returns the number removed"""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire `ttl` seconds after being stored"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        super().__init__(max_entries)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return default
+        return value
+
+    def set(self, key, value):
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+
+class UserProfileCache:
+    """Read-through cache of user profiles (name, email, role, category) keyed by user id"""
+
+    def __init__(self, users_collection, max_entries=10000, ttl=300):
+        self.users_collection = users_collection
+        self._profiles = TTLCache(max_entries, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the profile dict for user_id, or None if the user does not exist"""
+        return self.get_many([user_id]).get(str(user_id))
+
+    def get_many(self, user_ids):
+        """Return {user_id: profile} for the given ids, fetching all misses in one query"""
+        found = {}
+        missing = []
+        for user_id in set(str(uid) for uid in user_ids if uid):
+            profile = self._profiles.get(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = profile
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        object_ids = []
+        for user_id in missing:
+            try:
+                object_ids.append(ObjectId(user_id))
+            except (InvalidId, TypeError):
+                pass
+        if object_ids:
+            for user in self.users_collection.find({'_id': {'$in': object_ids}}, USER_PROFILE_PROJECTION):
+                user_id = str(user.pop('_id'))
+                self._profiles.set(user_id, user)
+                found[user_id] = user
+        return found
+
+    def invalidate(self, user_id):
+        self._profiles.delete(str(user_id))
+
+    def clear(self):
+        self._profiles.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._profiles),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class FilterKeyedCache:
+    """Values keyed by (category, status, ...) filter with write-driven invalidation.
+
+    Writes bump a generation counter; a value computed before an invalidation
+    is never stored, so a slow reader cannot re-insert stale data.
+    """
+
+    def __init__(self, max_entries=256):
+        self._entries = LRUCache(max_entries)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def put(self, key, value, generation):
+        """Cache value for key unless an invalidation happened since `generation`"""
+        with self._lock:
+            if generation == self._generation:
+                self._entries.set(key, value)
+        return value
+
+    def invalidate(self, category=None, statuses=()):
+        """Drop cached values that could contain an issue of `category` in any of `statuses`.
+
+        Keys start with (category, status); a None component means "unfiltered"
+        and therefore always matches. No category / no statuses means "any".
+        """
+        def affected(key):
+            key_category, key_status = key[0], key[1]
+            if category and key_category and key_category != category:
+                return False
+            if statuses and key_status and key_status not in statuses:
+                return False
+            return True
+
+        with self._lock:
+            self._generation += 1
+            return self._entries.delete_where(affected)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+class ResponseCache(FilterKeyedCache):
+    """Serialized listing responses, stored with their ETag"""
+
+    def store(self, key, body, generation):
+        """Cache (body, etag) for key unless an invalidation happened since `generation`"""
+        return self.put(key, (body, hashlib.sha1(body.encode()).hexdigest()), generation)
+
+
+def conditional_json_response(entry):
+    """Build a JSON response carrying an ETag; answers 304 when If-None-Match matches"""
+    body, etag = entry
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Clients may keep a copy but must revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
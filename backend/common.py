@@ -2,6 +2,45 @@ from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 
 
+# (collection, keys, options) for every index the backend relies on.
+# Compound keys follow the route query shapes: equality filters first, then the
+# sort key, so no listing needs an in-memory SORT (see index_advisor.py).
+INDEXES = [
+    ('users', [("email", ASCENDING)], {'unique': True}),
+    ('users', [("role", ASCENDING)], {}),
+    # /issues, /admin/reports, /staff/reports and /myreports, newest first with _id tie-break
+    ('issues', [("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ('issues', [("category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ('issues', [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ('issues', [("category", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ('issues', [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    # ?location= address search: one prefix equality, then newest first (see listing.search_query)
+    ('issues', [("location.address_prefixes", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ('issues', [("category", ASCENDING), ("location.address_prefixes", ASCENDING), ("created_at", DESCENDING),
+                ("_id", DESCENDING)], {}),
+    # /issues/nearby and /issues/within map queries, combinable with category/status
+    ('issues', [("location.point", "2dsphere"), ("category", ASCENDING), ("status", ASCENDING)], {}),
+    # /notifications listing, unread count and mark-read
+    ('notifications', [("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    ('notifications', [("user_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING)], {}),
+    # Outbox dispatcher claims (see outbox.py)
+    ('outbox', [("origin", ASCENDING), ("status", ASCENDING), ("available_at", ASCENDING)], {}),
+    # Reporter email digests: one open window per reporter, and the flusher's due scan (see digest.py)
+    ('email_digests', [("user_id", ASCENDING)], {'unique': True, 'partialFilterExpression': {'status': 'open'}}),
+    ('email_digests', [("status", ASCENDING), ("due_at", ASCENDING)], {}),
+    # Resumable uploads: open sessions per user, and garbage collection of idle ones (see upload_sessions.py)
+    ('upload_sessions', [("user_id", ASCENDING), ("status", ASCENDING)], {}),
+    ('upload_sessions', [("updated_at", ASCENDING)], {}),
+    # Incremental refresh of the token revocation list; entries outlive the 24h tokens by an hour (see auth.py)
+    ('token_revocations', [("updated_at", ASCENDING)], {'expireAfterSeconds': 25 * 3600}),
+]
+
+
+def ensure_indexes(db):
+    for collection_name, keys, options in INDEXES:
+        db[collection_name].create_index(keys, background=True, **options)
+
+
 def initialize_database():
     try:
         client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000)
@@ -13,20 +52,10 @@ def initialize_database():
         notifications_collection = db['notifications']
 
         try:
-            users_collection.create_index([("email", ASCENDING)], unique=True, background=True)
-            users_collection.create_index([("role", ASCENDING)], background=True)
-            issues_collection.create_index([("user_id", ASCENDING)], background=True)
-            issues_collection.create_index([("status", ASCENDING)], background=True)
-            issues_collection.create_index([("category", ASCENDING)], background=True)
-            issues_collection.create_index([("created_at", DESCENDING)], background=True)
-            issues_collection.create_index([("location.address", "text")], background=True)
-            notifications_collection.create_index([("user_id", ASCENDING)], background=True)
-            notifications_collection.create_index([("read", ASCENDING)], background=True)
-            notifications_collection.create_index([("created_at", DESCENDING)], background=True)
+            ensure_indexes(db)
         except Exception:
             pass
 
         return client, db, users_collection, issues_collection, notifications_collection
     except (ConnectionFailure, ServerSelectionTimeoutError):
         raise
-
@@ -0,0 +1,146 @@
+import threading
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+DIGEST_COLLECTION = 'email_digests'
+
+
+def merge_entries(entries):
+    """One transition per issue, oldest first: the latest status, and where the issue started"""
+    by_issue = {}
+    for transition in entries:
+        earlier = by_issue.get(transition['issue_id'])
+        if earlier is not None:
+            transition = {**transition, 'previous_status': earlier['previous_status']}
+        by_issue[transition['issue_id']] = transition
+    return list(by_issue.values())
+
+
+class ReporterDigest:
+    """Collects status transitions per reporter and hands them over once per window.
+
+    The first update for a reporter opens a window of `window_seconds`;
+    everything that reporter receives before it closes is delivered to
+    `send(transitions)` as one batch (always a single reporter's), with
+    repeated updates of the same issue merged into a single Pending ->
+    Resolved style entry. A window of 0 sends immediately and lets `send`
+    errors reach the caller, so the outbox retries them.
+
+    Open windows are documents in `collection`, so a restart loses nothing:
+    a background flusher leases each due digest, sends it and only then
+    deletes it. A digest whose send failed is picked up again once its lease
+    of `lease_seconds` runs out.
+    """
+
+    def __init__(self, send, collection, window_seconds=0, max_per_reporter=100, poll_interval=5,
+                 lease_seconds=60):
+        self.send = send
+        self.collection = collection
+        self.window_seconds = window_seconds
+        self.max_per_reporter = max_per_reporter
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.digests_sent = 0
+        self.updates_merged = 0
+        self.failed = 0
+
+    def start(self):
+        """Deliver due digests, including ones left over from a previous run, on a daemon thread"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='email-digest', daemon=True)
+                self._thread.start()
+
+    def add(self, transitions):
+        by_reporter = {}
+        for transition in transitions:
+            by_reporter.setdefault(transition['issue']['user_id'], []).append(transition)
+
+        if self.window_seconds <= 0:
+            for reporter_transitions in by_reporter.values():
+                self._deliver(reporter_transitions)
+            return
+
+        now = datetime.utcnow()
+        for user_id, reporter_transitions in by_reporter.items():
+            # One open digest per reporter (unique partial index), created by the first update
+            digest = self.collection.find_one_and_update(
+                {'user_id': user_id, 'status': 'open'},
+                {'$push': {'entries': {'$each': reporter_transitions}},
+                 '$inc': {'count': len(reporter_transitions)},
+                 '$setOnInsert': {'due_at': now + timedelta(seconds=self.window_seconds), 'created_at': now}},
+                projection={'count': 1}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            if digest['count'] >= self.max_per_reporter:
+                self.collection.update_one({'_id': digest['_id'], 'status': 'open'}, {'$set': {'due_at': now}})
+                self._wakeup.set()
+        self.start()
+
+    def flush(self):
+        """Send every pending digest now (shutdown, tests)"""
+        self.collection.update_many({'status': 'open'}, {'$set': {'due_at': datetime.utcnow()}})
+        return self.flush_due()
+
+    def flush_due(self):
+        """Send the digests whose window has closed; returns how many were sent"""
+        sent = 0
+        while True:
+            now = datetime.utcnow()
+            digest = self.collection.find_one_and_update(
+                {'$or': [{'status': 'open', 'due_at': {'$lte': now}},
+                         # Leased by a flusher that died or failed to send
+                         {'status': 'sending', 'locked_until': {'$lt': now}}]},
+                {'$set': {'status': 'sending', 'locked_until': now + timedelta(seconds=self.lease_seconds)}},
+                sort=[('due_at', 1)], return_document=ReturnDocument.AFTER
+            )
+            if digest is None:
+                return sent
+            transitions = merge_entries(digest['entries'])
+            try:
+                self._deliver(transitions)
+            except Exception as e:
+                print(f"Email digest for {digest['user_id']} failed, retrying in {self.lease_seconds}s: {e}")
+                continue
+            self.collection.delete_one({'_id': digest['_id']})
+            with self._lock:
+                self.updates_merged += len(digest['entries']) - len(transitions)
+            sent += 1
+
+    def _run(self):
+        while True:
+            try:
+                self.flush_due()
+            except Exception as e:
+                print(f"Email digest flusher error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _deliver(self, transitions):
+        if not transitions:
+            return
+        try:
+            self.send(transitions)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.digests_sent += 1
+
+    def stats(self):
+        pending = list(self.collection.aggregate([
+            {'$group': {'_id': None, 'reporters': {'$sum': 1}, 'updates': {'$sum': '$count'}}}
+        ]))
+        with self._lock:
+            return {
+                'window_seconds': self.window_seconds,
+                'reporters_pending': pending[0]['reporters'] if pending else 0,
+                'updates_pending': pending[0]['updates'] if pending else 0,
+                'digests_sent': self.digests_sent,
+                'updates_merged': self.updates_merged,
+                'failed': self.failed
+            }
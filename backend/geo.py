@@ -0,0 +1,264 @@
+import math
+
+DEFAULT_MAP_LIMIT = 500
+MAX_MAP_LIMIT = 2000
+MAX_RADIUS_METERS = 50000
+# bbox polygons get a vertex every EDGE_STEP degrees of longitude; a great-circle
+# edge that short stays within ~0.001 degrees of its parallel, well inside EDGE_MARGIN
+EDGE_STEP = 1.0
+EDGE_MARGIN = 0.01
+# Keeps polygon vertices off the poles, where they would collapse into duplicates
+POLYGON_MAX_LATITUDE = 89.99
+# Widest longitude span of one polygon; wider viewports are split so each piece stays well inside
+# a hemisphere and never has vertices at both -180 and 180 (the same meridian)
+MAX_POLYGON_SPAN = 90.0
+
+
+def make_point(latitude, longitude):
+    """Return a GeoJSON point for valid coordinates, or None"""
+    if latitude is None or longitude is None:
+        return None
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    # GeoJSON orders coordinates as [longitude, latitude]
+    return {'type': 'Point', 'coordinates': [longitude, latitude]}
+
+
+def parse_bbox(value):
+    """Parse "minLng,minLat,maxLng,maxLat" into a tuple of floats, raising ValueError if invalid"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError('bbox must be "minLng,minLat,maxLng,maxLat"')
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError('bbox is out of range')
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def parse_map_limit(value):
+    if value is None:
+        return DEFAULT_MAP_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_MAP_LIMIT)
+
+
+def near_query(latitude, longitude, radius_meters):
+    """Issues within radius_meters of a point, nearest first"""
+    return {'location.point': {'$nearSphere': {
+        '$geometry': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        '$maxDistance': radius_meters
+    }}}
+
+
+def bbox_polygon(bbox):
+    """GeoJSON polygon containing the whole flat lat/lng rectangle.
+
+    2dsphere treats polygon edges as great circles, which bow toward the pole
+    and would cut off part of a wide rectangle. Edges are therefore densified
+    and pushed out by EDGE_MARGIN, so the polygon is a slight superset;
+    bbox_query trims it back with flat coordinate bounds.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    low = max(min_lat - EDGE_MARGIN, -POLYGON_MAX_LATITUDE)
+    high = min(max_lat + EDGE_MARGIN, POLYGON_MAX_LATITUDE)
+    steps = max(1, math.ceil((max_lng - min_lng) / EDGE_STEP))
+    lngs = [min_lng + (max_lng - min_lng) * i / steps for i in range(steps + 1)]
+    ring = [[lng, low] for lng in lngs] + [[lng, high] for lng in reversed(lngs)]
+    ring.append(ring[0])
+    return {'type': 'Polygon', 'coordinates': [ring]}
+
+
+def flat_bounds(bbox):
+    """Exact lat/lng range filter, the same rectangle the map and the cluster cells use"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return {
+        'location.point.coordinates.0': {'$gte': min_lng, '$lte': max_lng},
+        'location.point.coordinates.1': {'$gte': min_lat, '$lte': max_lat}
+    }
+
+
+def bbox_query(bbox):
+    """Issues whose point lies inside a map viewport; the 2dsphere index narrows, flat bounds decide"""
+    return {'location.point': {'$geoWithin': {'$geometry': bbox_polygon(bbox)}}, **flat_bounds(bbox)}
+
+
+def extent_query(extent):
+    """bbox_query that stays valid for any viewport, up to the whole world.
+
+    Extents wider than MAX_POLYGON_SPAN degrees of longitude are split into
+    equal pieces, one polygon each.
+    """
+    min_lng, min_lat, max_lng, max_lat = extent
+    parts = math.ceil((max_lng - min_lng) / MAX_POLYGON_SPAN)
+    if parts <= 1:
+        return bbox_query(extent)
+    width = (max_lng - min_lng) / parts
+    edges = [min_lng + width * i for i in range(parts)] + [max_lng]
+    return {'$or': [bbox_query((edges[i], min_lat, edges[i + 1], max_lat)) for i in range(parts)]}
+
+
+def find_nearby(issues_collection, query, latitude, longitude, radius_meters, limit):
+    """Raw issue documents near a point, combined with the category/status filter in `query`"""
+    return list(issues_collection.find({**query, **near_query(latitude, longitude, radius_meters)}).limit(limit))
+
+
+def find_within(issues_collection, query, bbox, limit):
+    """Raw issue documents inside a bbox, combined with the filter in `query`.
+
+    Map markers need no particular order, so the 2dsphere index answers the
+    query without a sort stage.
+    """
+    return list(issues_collection.find({**query, **extent_query(bbox)}).limit(limit))
+
+
+def migrate_points(issues_collection):
+    """Backfill location.point on issues that only carry loose latitude/longitude floats.
+
+    Runs as one server-side pipeline update; already migrated issues and
+    out-of-range coordinates are skipped, so it is safe to re-run.
+    """
+    result = issues_collection.update_many(
+        {
+            'location.point': {'$exists': False},
+            'location.latitude': {'$type': 'number', '$gte': -90, '$lte': 90},
+            'location.longitude': {'$type': 'number', '$gte': -180, '$lte': 180}
+        },
+        [{'$set': {'location.point': {
+            'type': 'Point',
+            'coordinates': ['$location.longitude', '$location.latitude']
+        }}}]
+    )
+    return result.modified_count
+
+
+# Map clustering: the world is cut into 2^zoom x 2^zoom equirectangular tiles,
+# each split into CELLS_PER_TILE x CELLS_PER_TILE grid cells. Issues are bucketed
+# per cell, so the number of clusters in a viewport depends on the screen size,
+# not on how many issues the city has.
+CELLS_PER_TILE = 8
+MIN_CLUSTER_ZOOM = 3
+MAX_CLUSTER_ZOOM = 20
+MAX_CLUSTER_TILES = 64
+# Web-map latitude limits; also keeps tile polygons away from the poles
+MAX_LATITUDE = 85.0
+
+
+def parse_zoom(value):
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('zoom must be an integer')
+    return max(MIN_CLUSTER_ZOOM, min(zoom, MAX_CLUSTER_ZOOM))
+
+
+def tile_size(zoom):
+    """Tile edge length in degrees"""
+    return 360.0 / (2 ** zoom)
+
+
+def covering_tiles(bbox, zoom):
+    """(x, y) indexes of every tile intersecting bbox, raising ValueError if there are too many"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    size = tile_size(zoom)
+    last = 2 ** zoom - 1
+    x0, x1 = int((min_lng + 180) // size), min(int((max_lng + 180) // size), last)
+    y0, y1 = int((min_lat + 90) // size), min(int((max_lat + 90) // size), last)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CLUSTER_TILES:
+        raise ValueError('bbox is too large for this zoom level')
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def tiles_extent(tiles, zoom):
+    """Bounding box covering a set of tiles, clamped to web-map latitudes"""
+    size = tile_size(zoom)
+    xs = [x for x, _ in tiles]
+    ys = [y for _, y in tiles]
+    return (
+        min(xs) * size - 180,
+        max(min(ys) * size - 90, -MAX_LATITUDE),
+        min((max(xs) + 1) * size - 180, 180),
+        min((max(ys) + 1) * size - 90, MAX_LATITUDE)
+    )
+
+
+
+
+def cluster_pipeline(query, extent, zoom):
+    cell = tile_size(zoom) / CELLS_PER_TILE
+    return [
+        {'$match': {**query, **extent_query(extent)}},
+        {'$project': {
+            'status': {'$ifNull': ['$status', 'Unknown']},
+            'lng': {'$arrayElemAt': ['$location.point.coordinates', 0]},
+            'lat': {'$arrayElemAt': ['$location.point.coordinates', 1]}
+        }},
+        {'$group': {
+            '_id': {
+                'x': {'$floor': {'$divide': [{'$add': ['$lng', 180]}, cell]}},
+                'y': {'$floor': {'$divide': [{'$add': ['$lat', 90]}, cell]}},
+                'status': '$status'
+            },
+            'count': {'$sum': 1},
+            'lng': {'$sum': '$lng'},
+            'lat': {'$sum': '$lat'}
+        }},
+        {'$group': {
+            '_id': {'x': '$_id.x', 'y': '$_id.y'},
+            'count': {'$sum': '$count'},
+            'lng': {'$sum': '$lng'},
+            'lat': {'$sum': '$lat'},
+            'statuses': {'$push': {'k': '$_id.status', 'v': '$count'}}
+        }},
+        {'$project': {
+            '_id': 0,
+            'cell': '$_id',
+            'count': 1,
+            'lng': {'$divide': ['$lng', '$count']},
+            'lat': {'$divide': ['$lat', '$count']},
+            'statuses': {'$arrayToObject': '$statuses'}
+        }}
+    ]
+
+
+def cluster_issues(issues_collection, query, bbox, zoom, tile_cache=None, filter_key=(None, None)):
+    """Return clusters ({lat, lng, count, statuses}) for every tile covering bbox.
+
+    Tiles found in `tile_cache` (a cache.FilterKeyedCache keyed by
+    filter_key + (zoom, x, y)) are reused; the remaining ones are computed with
+    a single aggregation and cached.
+    """
+    tiles = covering_tiles(bbox, zoom)
+    clusters = []
+    missing = []
+    for tile in tiles:
+        cached = tile_cache.get(filter_key + (zoom,) + tile) if tile_cache else None
+        if cached is None:
+            missing.append(tile)
+        else:
+            clusters.extend(cached)
+
+    if missing:
+        generation = tile_cache.generation if tile_cache else None
+        computed = {tile: [] for tile in missing}
+        pipeline = cluster_pipeline(query, tiles_extent(missing, zoom), zoom)
+        for cluster in issues_collection.aggregate(pipeline):
+            cell = cluster.pop('cell')
+            tile = (int(cell['x']) // CELLS_PER_TILE, int(cell['y']) // CELLS_PER_TILE)
+            # The extent can overlap tiles that were already cached
+            if tile in computed:
+                computed[tile].append(cluster)
+        for tile, tile_clusters in computed.items():
+            if tile_cache:
+                tile_cache.put(filter_key + (zoom,) + tile, tile_clusters, generation)
+            clusters.extend(tile_clusters)
+    return clusters
@@ -0,0 +1,135 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from common import INDEXES
+from geo import bbox_query
+from listing import LISTING_SORT, keyset_query, search_query
+
+# Representative values; the planner only cares about the shape of the query
+SAMPLE_USER_ID = str(ObjectId())
+SAMPLE_CURSOR = (datetime.utcnow(), ObjectId())
+
+# (route, collection, filter, sort, limit) for every query the routes issue
+ROUTE_QUERIES = [
+    ('GET /issues', 'issues', {}, LISTING_SORT, 50),
+    ('GET /issues?category', 'issues', {'category': 'Roads'}, LISTING_SORT, 50),
+    ('GET /issues?status', 'issues', {'status': 'Pending'}, LISTING_SORT, 50),
+    ('GET /issues?category&status', 'issues', {'category': 'Roads', 'status': 'Pending'}, LISTING_SORT, 50),
+    ('GET /issues?cursor', 'issues', keyset_query({}, SAMPLE_CURSOR), LISTING_SORT, 50),
+    ('GET /issues?category&cursor', 'issues', keyset_query({'category': 'Roads'}, SAMPLE_CURSOR), LISTING_SORT, 50),
+    ('GET /myreports', 'issues', {'user_id': SAMPLE_USER_ID}, LISTING_SORT, 50),
+    ('GET /myreports?cursor', 'issues', keyset_query({'user_id': SAMPLE_USER_ID}, SAMPLE_CURSOR), LISTING_SORT, 50),
+    ('GET /staff/reports', 'issues', {'category': 'Roads'}, LISTING_SORT, 50),
+    ('GET /staff/reports?status', 'issues', {'category': 'Roads', 'status': 'Pending'}, LISTING_SORT, 50),
+    ('GET /admin/reports?location', 'issues', search_query({}, 'main st'), LISTING_SORT, 50),
+    ('GET /staff/reports?location', 'issues', search_query({'category': 'Roads'}, 'main st'), LISTING_SORT, 50),
+    ('GET /issues/within', 'issues', bbox_query((77.5, 12.9, 77.7, 13.1)), None, 500),
+    ('GET /issues/within?category', 'issues', {'category': 'Roads', **bbox_query((77.5, 12.9, 77.7, 13.1))},
+     None, 500),
+    ('GET /notifications', 'notifications', {'user_id': SAMPLE_USER_ID}, [('created_at', -1)], 20),
+    ('GET /notifications (unread count)', 'notifications', {'user_id': SAMPLE_USER_ID, 'read': False}, None, None),
+    ('POST /notifications/mark-read', 'notifications', {'user_id': SAMPLE_USER_ID, 'read': False}, None, None),
+    ('POST /login', 'users', {'email': 'someone@example.com'}, None, None),
+]
+
+# Stages that mean the query reads the whole collection or sorts in memory
+PROBLEM_STAGES = {
+    'COLLSCAN': 'collection scan',
+    'SORT': 'in-memory sort',
+}
+
+
+def plan_stages(plan):
+    """Yield every stage name in an explain() plan tree (classic and SBE formats)"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for key in ('queryPlan', 'inputStage', 'winningPlan'):
+            if key in plan:
+                yield from plan_stages(plan[key])
+        for child in plan.get('inputStages', []):
+            yield from plan_stages(child)
+
+
+def plan_indexes(plan):
+    """Yield the index names used by IXSCAN stages in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if plan.get('stage') == 'IXSCAN':
+            yield plan.get('indexName')
+        for key in ('queryPlan', 'inputStage', 'winningPlan'):
+            if key in plan:
+                yield from plan_indexes(plan[key])
+        for child in plan.get('inputStages', []):
+            yield from plan_indexes(child)
+
+
+def explain_route(db, collection_name, query, sort=None, limit=None):
+    """Return (stages, indexes) of the winning plan for a route query"""
+    cursor = db[collection_name].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+    return list(plan_stages(winning_plan)), list(plan_indexes(winning_plan))
+
+
+def analyze(db):
+    """Explain every route query; returns a list of result dicts with any problems found"""
+    results = []
+    for route, collection_name, query, sort, limit in ROUTE_QUERIES:
+        stages, indexes = explain_route(db, collection_name, query, sort, limit)
+        problems = [PROBLEM_STAGES[stage] for stage in stages if stage in PROBLEM_STAGES]
+        results.append({
+            'route': route,
+            'collection': collection_name,
+            'stages': stages,
+            'indexes': indexes,
+            'problems': problems
+        })
+    return results
+
+
+def undeclared_indexes(db):
+    """List (collection, index name) for indexes present in Mongo but not declared in INDEXES"""
+    def normalize(keys):
+        # Key order matters; directions may come back from the server as floats
+        return [(field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys]
+
+    declared = {}
+    for collection_name, keys, _ in INDEXES:
+        declared.setdefault(collection_name, []).append(normalize(keys))
+    extra = []
+    for collection_name, key_lists in declared.items():
+        for name, info in db[collection_name].index_information().items():
+            if name == '_id_':
+                continue
+            keys = normalize(info['key'])
+            # Text indexes are reported as _fts/_ftsx keys
+            if keys and keys[0][0] == '_fts':
+                continue
+            if keys not in key_lists:
+                extra.append((collection_name, name))
+    return extra
+
+
+def print_report(db):
+    """Print the advisor report; returns the number of flagged routes"""
+    flagged = 0
+    for result in analyze(db):
+        status = 'OK  ' if not result['problems'] else 'WARN'
+        used = ', '.join(i for i in result['indexes'] if i) or '-'
+        print(f"[{status}] {result['route']:<36} {' > '.join(result['stages']):<32} index: {used}")
+        if result['problems']:
+            flagged += 1
+            print(f"       -> {', '.join(result['problems'])}")
+
+    extra = undeclared_indexes(db)
+    if extra:
+        print("\nIndexes present in MongoDB but not declared in common.INDEXES (candidates to drop):")
+        for collection_name, name in extra:
+            print(f"  {collection_name}.{name}")
+
+    print(f"\n{flagged} route(s) flagged")
+    return flagged
@@ -0,0 +1,170 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Listings are ordered newest first; _id breaks ties between equal timestamps
+LISTING_SORT = [('created_at', -1), ('_id', -1)]
+
+# Address search: every word of location.address is stored with all of its
+# leading substrings in location.address_prefixes ("main" -> m, ma, mai, main),
+# so each search term is one equality match on a multikey index
+ADDRESS_WORD = re.compile(r'[^\W_]+')
+MAX_PREFIX_LENGTH = 20
+
+
+def _encode_token(data):
+    raw = json.dumps(data)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(issue):
+    """Build an opaque cursor token pointing just after the given issue"""
+    return _encode_token({'t': issue['created_at'].isoformat(), 'i': str(issue['_id'])})
+
+
+def decode_cursor(token):
+    """Decode a cursor token into (created_at, _id), raising ValueError if malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data['t']), ObjectId(data['i'])
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise ValueError('Invalid cursor')
+
+
+def parse_page_args(args):
+    """Read limit/cursor query parameters.
+
+    Returns (limit, cursor); without a limit a page holds DEFAULT_PAGE_SIZE
+    issues, so no listing returns the whole collection.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE), (decode_cursor(cursor) if cursor else None)
+
+
+def keyset_query(query, cursor):
+    """Restrict a query to issues strictly after the (created_at, _id) cursor"""
+    if not cursor:
+        return query
+    created_at, last_id = cursor
+    # The $lte bound lets the planner seek the (..., created_at, _id) index directly
+    after = {'created_at': {'$lte': created_at}, '$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}}
+    ]}
+    return {'$and': [query, after]} if query else after
+
+
+def serialize_issue(issue):
+    """Convert an issue document into a JSON-safe dict"""
+    issue['_id'] = str(issue['_id'])
+    issue['created_at'] = issue['created_at'].isoformat()
+    issue['updated_at'] = issue['updated_at'].isoformat()
+    # Only the WebP variants are linked: the stored original keeps the camera's EXIF/GPS data.
+    # Until the pipeline has made them the issue is shown without an image
+    variants = issue.get('image_variants') or {}
+    issue['image'] = variants.get('medium')
+    issue['thumbnail'] = variants.get('thumb')
+    issue.pop('image_meta', None)
+    return issue
+
+
+def attach_reporters(issues, user_cache, include_email=False):
+    """Attach reporter name (and optionally email) to issues with one batched profile lookup"""
+    users = user_cache.get_many(issue.get('user_id') for issue in issues)
+    for issue in issues:
+        user = users.get(issue.get('user_id'))
+        issue['user_name'] = user['name'] if user else 'Unknown'
+        if include_email:
+            issue['user_email'] = user['email'] if user else 'Unknown'
+    return issues
+
+
+def address_prefixes(address):
+    """Sorted distinct prefixes of every word in an address, stored as location.address_prefixes"""
+    prefixes = set()
+    for word in ADDRESS_WORD.findall((address or '').lower()):
+        word = word[:MAX_PREFIX_LENGTH]
+        prefixes.update(word[:end] for end in range(1, len(word) + 1))
+    return sorted(prefixes)
+
+
+def search_query(query, search):
+    """Restrict a query to issues whose address has a word starting with every term of `search`.
+
+    "Main Street" needs both words and "Mai" matches "Main"; a search
+    without any word leaves the query unchanged.
+    """
+    terms = sorted({term[:MAX_PREFIX_LENGTH] for term in ADDRESS_WORD.findall(search.lower())})
+    if not terms:
+        return query
+    return {**query, 'location.address_prefixes': {'$all': terms}}
+
+
+def migrate_address_prefixes(issues_collection, batch_size=1000):
+    """Backfill location.address_prefixes on issues created before address search used it.
+
+    Already migrated issues are skipped, so it is safe to re-run.
+    """
+    migrated = 0
+    batch = []
+    pending = issues_collection.find(
+        {'location.address': {'$type': 'string'}, 'location.address_prefixes': {'$exists': False}},
+        {'location.address': 1}
+    )
+    for issue in pending:
+        batch.append(UpdateOne({'_id': issue['_id']},
+                               {'$set': {'location.address_prefixes': address_prefixes(issue['location']['address'])}}))
+        if len(batch) >= batch_size:
+            migrated += issues_collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        migrated += issues_collection.bulk_write(batch, ordered=False).modified_count
+    return migrated
+
+
+def list_issues(issues_collection, user_cache, query, with_reporter=True, include_email=False,
+                limit=None, cursor=None, search=None):
+    """Shared listing pipeline: one issues query plus one batched reporter lookup.
+
+    Returns (issues, next_cursor). With a limit the query seeks straight to the
+    cursor position through the (..., created_at, _id) indexes, so every page
+    costs the same regardless of depth. A `search` string keeps only issues
+    whose address matches every term (see search_query), still newest first.
+    """
+    if search:
+        query = search_query(query, search)
+    find = issues_collection.find(keyset_query(query, cursor)).sort(LISTING_SORT)
+    if limit:
+        find = find.limit(limit + 1)
+    issues = list(find)
+
+    next_cursor = None
+    if limit and len(issues) > limit:
+        issues = issues[:limit]
+        next_cursor = encode_cursor(issues[-1])
+
+    if with_reporter:
+        return present_issues(issues, user_cache, include_email=include_email), next_cursor
+    return [serialize_issue(issue) for issue in issues], next_cursor
+
+
+def present_issues(issues, user_cache, include_email=False):
+    """Attach reporters in one batched lookup and serialize raw issue documents"""
+    attach_reporters(issues, user_cache, include_email=include_email)
+    return [serialize_issue(issue) for issue in issues]
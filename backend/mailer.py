@@ -0,0 +1,161 @@
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+
+class EmailQueueFull(Exception):
+    """The mail queue stayed full for longer than the caller was willing to wait"""
+
+
+class PooledMailer:
+    """Bounded email queue served by a few workers that each keep one SMTP connection open.
+
+    A connection is opened (STARTTLS + login) on first use, reused for every
+    following message and closed after `idle_timeout` seconds without work.
+    A failed send reconnects and retries with exponential backoff up to
+    `max_attempts` times. `send()` blocks while the queue is full, up to its
+    timeout, so producers slow down instead of piling up threads.
+
+    `config` uses the EMAIL_CONFIG keys; an empty EMAIL_PASSWORD skips login,
+    which is what a local stand-in server (e.g. `python -m aiosmtpd -n -l
+    localhost:1025`) expects.
+    """
+
+    def __init__(self, config, workers=2, max_queue=1000, max_attempts=3, retry_backoff=1.0,
+                 idle_timeout=30, connect_timeout=10):
+        self.config = config
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.connections_opened = 0
+        self.total_send_ms = 0.0
+        self.max_send_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'mailer-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Send what is queued, then stop the workers"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def send(self, to_email, subject, body, timeout=5):
+        """Queue an HTML email; raises EmailQueueFull if no slot frees up within timeout"""
+        self.start()
+        try:
+            self._queue.put((to_email, subject, body, time.perf_counter()), timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise EmailQueueFull(f'Email queue is full ({self._queue.maxsize} messages)')
+
+    def _build_message(self, to_email, subject, body):
+        msg = MIMEMultipart()
+        msg['From'] = self.config['EMAIL_ADDRESS']
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html'))
+        return msg.as_string()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.config['SMTP_SERVER'], self.config['SMTP_PORT'], timeout=self.connect_timeout)
+        if self.config.get('USE_TLS'):
+            server.starttls()
+        if self.config.get('EMAIL_PASSWORD'):
+            server.login(self.config['EMAIL_ADDRESS'], self.config['EMAIL_PASSWORD'])
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def _work(self):
+        server = None
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # Idle: don't hold a connection the SMTP server will drop anyway
+                self._close(server)
+                server = None
+                continue
+            if item is None:
+                self._close(server)
+                self._queue.task_done()
+                return
+
+            to_email, subject, body, queued_at = item
+            message = self._build_message(to_email, subject, body)
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    if server is None:
+                        server = self._connect()
+                    server.sendmail(self.config['EMAIL_ADDRESS'], to_email, message)
+                    self._record_sent(queued_at)
+                    break
+                except Exception as e:
+                    # The connection state is unknown after an error; start over
+                    self._close(server)
+                    server = None
+                    if attempt == self.max_attempts:
+                        with self._lock:
+                            self.failed += 1
+                        print(f"❌ Failed to send email to {to_email}: {e}")
+                    else:
+                        with self._lock:
+                            self.retried += 1
+                        time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            self._queue.task_done()
+
+    def _record_sent(self, queued_at):
+        elapsed_ms = (time.perf_counter() - queued_at) * 1000
+        with self._lock:
+            self.sent += 1
+            self.total_send_ms += elapsed_ms
+            self.max_send_ms = max(self.max_send_ms, elapsed_ms)
+
+    def wait_until_empty(self):
+        """Block until every queued email was sent or gave up (benchmarks, shutdown)"""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'workers': len(self._threads),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'rejected': self.rejected,
+                'connections_opened': self.connections_opened,
+                'avg_send_ms': round(self.total_send_ms / self.sent, 2) if self.sent else 0.0,
+                'max_send_ms': round(self.max_send_ms, 2)
+            }
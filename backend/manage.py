@@ -0,0 +1,140 @@
+"""
+Maintenance commands for the Civic Issue backend.
+
+Usage (from backend/):
+    python manage.py ensure-indexes
+    python manage.py index-advisor
+    python manage.py migrate-geo-points
+    python manage.py migrate-address-search
+    python manage.py rebuild-stats
+    python manage.py outbox-requeue --origin app
+    python manage.py backfill-thumbnails --folder uploads
+    python manage.py migrate-upload-layout --folder uploads
+    python manage.py revoke-tokens --email staff@example.com
+"""
+
+import argparse
+import sys
+
+from common import ensure_indexes, initialize_database
+
+
+def cmd_ensure_indexes(db, args):
+    ensure_indexes(db)
+    print("✅ Database indexes created/verified")
+    return 0
+
+
+def cmd_index_advisor(db, args):
+    from index_advisor import print_report
+
+    if args.ensure:
+        ensure_indexes(db)
+    flagged = print_report(db)
+    return 1 if flagged else 0
+
+
+def cmd_migrate_geo_points(db, args):
+    from geo import migrate_points
+
+    migrated = migrate_points(db['issues'])
+    print(f"✅ Added GeoJSON points to {migrated} issue(s)")
+    return 0
+
+
+def cmd_migrate_address_search(db, args):
+    from listing import migrate_address_prefixes
+
+    migrated = migrate_address_prefixes(db['issues'])
+    print(f"✅ Added address search prefixes to {migrated} issue(s)")
+    return 0
+
+
+def cmd_rebuild_stats(db, args):
+    from stats import STATS_COLLECTION, rebuild_stats
+
+    rebuilt = rebuild_stats(db['issues'], db[STATS_COLLECTION])
+    for category, doc in sorted(rebuilt.items()):
+        print(f"  {category}: {doc['total']} {doc['statuses']}")
+    print(f"✅ Rebuilt counters for {len(rebuilt)} categor{'y' if len(rebuilt) == 1 else 'ies'}")
+    return 0
+
+
+def cmd_outbox_requeue(db, args):
+    from outbox import OUTBOX_COLLECTION, Outbox
+
+    requeued = Outbox(db[OUTBOX_COLLECTION], args.origin).requeue_failed()
+    print(f"✅ Requeued {requeued} failed outbox event(s) for {args.origin}")
+    return 0
+
+
+def cmd_backfill_thumbnails(db, args):
+    from thumbnails import backfill
+    from uploads import UPLOADS_COLLECTION
+
+    processed, failed = backfill(args.folder, db['issues'], db[UPLOADS_COLLECTION], workers=args.workers)
+    print(f"✅ Created thumbnails for {processed} image(s)" + (f", {failed} failed" if failed else ''))
+    return 1 if failed else 0
+
+
+def cmd_migrate_upload_layout(db, args):
+    from uploads import UPLOADS_COLLECTION, migrate_to_sharded
+
+    moved, issues, uploads = migrate_to_sharded(args.folder, db['issues'], db[UPLOADS_COLLECTION])
+    print(f"✅ Moved {moved} file(s) into shards, rewrote {issues} issue(s) and {uploads} upload record(s)")
+    return 0
+
+
+def cmd_revoke_tokens(db, args):
+    from auth import TOKEN_REVOCATIONS_COLLECTION, RevocationList
+
+    user = db['users'].find_one({'email': args.email}, {'_id': 1})
+    if not user:
+        print(f"❌ No user with email {args.email}")
+        return 1
+    RevocationList(db[TOKEN_REVOCATIONS_COLLECTION]).revoke_user(user['_id'], reason=args.reason)
+    print(f"✅ Revoked existing tokens of {args.email}; they take effect in every worker within seconds")
+    return 0
+
+
+COMMANDS = {
+    'ensure-indexes': (cmd_ensure_indexes, 'Create every index declared in common.INDEXES'),
+    'index-advisor': (cmd_index_advisor, 'Explain each route query and flag COLLSCAN / in-memory SORT'),
+    'migrate-geo-points': (cmd_migrate_geo_points, 'Backfill location.point on existing issues'),
+    'migrate-address-search': (cmd_migrate_address_search, 'Backfill location.address_prefixes for ?location= search'),
+    'rebuild-stats': (cmd_rebuild_stats, 'Reconcile dashboard counters with the issues collection'),
+    'outbox-requeue': (cmd_outbox_requeue, 'Retry outbox events that exhausted their attempts'),
+    'backfill-thumbnails': (cmd_backfill_thumbnails, 'Create WebP variants for report images that have none'),
+    'migrate-upload-layout': (cmd_migrate_upload_layout, 'Move flat uploads into ab/cd/ shards and rewrite image fields'),
+    'revoke-tokens': (cmd_revoke_tokens, "Log a user out everywhere, e.g. after changing their role"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Civic Issue backend maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if name == 'index-advisor':
+            subparser.add_argument('--ensure', action='store_true', help='Create declared indexes before explaining')
+        if name == 'outbox-requeue':
+            subparser.add_argument('--origin', default='app', help='Dispatcher origin (app or admin_app)')
+        if name in ('backfill-thumbnails', 'migrate-upload-layout'):
+            subparser.add_argument('--folder', default='uploads', help='Directory holding the uploaded images')
+        if name == 'revoke-tokens':
+            subparser.add_argument('--email', required=True, help='Email of the user to log out')
+            subparser.add_argument('--reason', default='role change', help='Recorded with the revocation')
+        if name == 'backfill-thumbnails':
+            subparser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    client, db, *_ = initialize_database()
+    try:
+        handler, _ = COMMANDS[args.command]
+        return handler(db, args)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
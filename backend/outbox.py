@@ -0,0 +1,272 @@
+import threading
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+OUTBOX_COLLECTION = 'outbox'
+
+
+def supports_transactions(client):
+    """Multi-document transactions need a replica set or a sharded cluster"""
+    try:
+        hello = client.admin.command('hello')
+    except Exception:
+        return False
+    return 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+
+class Outbox:
+    """Events written next to the data change that caused them.
+
+    `origin` names the process that drains them, so the admin and user services
+    can share one collection and each only runs its own handlers.
+    """
+
+    def __init__(self, collection, origin):
+        self.collection = collection
+        self.origin = origin
+        self._wakeup = threading.Event()
+
+    def add(self, event_type, payload, session=None):
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            'origin': self.origin,
+            'type': event_type,
+            'payload': payload,
+            'status': 'pending',
+            'attempts': 0,
+            'done': [],
+            'created_at': now,
+            'available_at': now
+        }, session=session)
+
+    def notify(self):
+        """Wake the dispatcher; call once the write that added events is committed"""
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        woken = self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return woken
+
+    def _claimable(self, now):
+        return {'origin': self.origin, '$or': [
+            {'status': 'pending', 'available_at': {'$lte': now}},
+            # Events claimed by a dispatcher that died before finishing them
+            {'status': 'processing', 'locked_until': {'$lt': now}}
+        ]}
+
+    def claim(self, batch_size, lease_seconds):
+        """Lease up to batch_size due events to this caller, oldest first"""
+        now = datetime.utcnow()
+        claimable = self._claimable(now)
+        ids = [doc['_id'] for doc in
+               self.collection.find(claimable, {'_id': 1}).sort('available_at', ASCENDING).limit(batch_size)]
+        if not ids:
+            return []
+        token = ObjectId()
+        # Re-checking the claimable filter makes concurrent claims of the same event lose
+        self.collection.update_many({**claimable, '_id': {'$in': ids}}, {'$set': {
+            'status': 'processing',
+            'claim': token,
+            'locked_until': now + timedelta(seconds=lease_seconds)
+        }})
+        return list(self.collection.find({'claim': token}).sort('created_at', ASCENDING))
+
+    def mark_step_done(self, event, step):
+        self.collection.update_one({'_id': event['_id']}, {'$addToSet': {'done': step}})
+
+    def complete(self, event):
+        self.collection.delete_one({'_id': event['_id']})
+
+    def retry_later(self, event, error, delay_seconds):
+        self.collection.update_one({'_id': event['_id']}, {
+            '$set': {'status': 'pending', 'available_at': datetime.utcnow() + timedelta(seconds=delay_seconds),
+                     'last_error': error},
+            '$inc': {'attempts': 1},
+            '$unset': {'claim': '', 'locked_until': ''}
+        })
+
+    def fail(self, event, error):
+        self.collection.update_one({'_id': event['_id']}, {
+            '$set': {'status': 'failed', 'last_error': error, 'failed_at': datetime.utcnow()},
+            '$inc': {'attempts': 1},
+            '$unset': {'claim': '', 'locked_until': ''}
+        })
+
+    def requeue_failed(self):
+        """Give failed events a fresh set of attempts; returns how many were requeued"""
+        result = self.collection.update_many({'origin': self.origin, 'status': 'failed'}, {
+            '$set': {'status': 'pending', 'attempts': 0, 'available_at': datetime.utcnow()}
+        })
+        return result.modified_count
+
+    def backlog(self):
+        """(pending count, failed count, age in seconds of the oldest pending event)"""
+        pending = self.collection.count_documents({'origin': self.origin, 'status': {'$in': ['pending', 'processing']}})
+        failed = self.collection.count_documents({'origin': self.origin, 'status': 'failed'})
+        oldest = self.collection.find_one({'origin': self.origin, 'status': {'$in': ['pending', 'processing']}},
+                                          {'created_at': 1}, sort=[('created_at', ASCENDING)])
+        age = (datetime.utcnow() - oldest['created_at']).total_seconds() if oldest else 0.0
+        return pending, failed, age
+
+
+def deferred(handler):
+    """Mark a handler whose work is acknowledged later.
+
+    It is called as handler(payload, done) and must call done() once the work
+    is confirmed, or done(error) if it failed; the event stays leased until
+    then, so the dispatcher thread never waits on it.
+    """
+    handler.deferred = True
+    return handler
+
+
+class _Dispatch:
+    """Bookkeeping for one claimed event while deferred steps are outstanding"""
+
+    def __init__(self, event):
+        self.event = event
+        self.waiting = set()
+        self.failure = None
+        self.running = True
+        self.finished = False
+
+
+class OutboxDispatcher:
+    """Background worker that drains an Outbox in batches.
+
+    `handlers` maps an event type to a list of callables taking the event
+    payload. Each handler that succeeds is recorded on the event, so a retry
+    only re-runs the ones that failed; delivery is at-least-once (a crash
+    between a handler and its bookkeeping repeats that handler). Failing events
+    are retried with exponential backoff and parked as 'failed' after
+    max_attempts (see `manage.py outbox-requeue`). Handlers marked @deferred
+    finish asynchronously; the event completes once every one has called back.
+    """
+
+    def __init__(self, outbox, handlers, batch_size=100, poll_interval=1.0, lease_seconds=60,
+                 max_attempts=8, max_backoff=300):
+        self.outbox = outbox
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.dispatched = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'outbox-{self.outbox.origin}', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.outbox.notify()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                # Keep going while full batches come back; otherwise sleep until woken
+                if self.drain_once() == self.batch_size:
+                    continue
+            except Exception as e:
+                print(f"Outbox dispatcher error: {e}")
+            self.outbox.wait(self.poll_interval)
+
+    def drain_once(self):
+        """Dispatch one batch; returns the number of events claimed"""
+        events = self.outbox.claim(self.batch_size, self.lease_seconds)
+        for event in events:
+            self._dispatch(event)
+        return len(events)
+
+    def _dispatch(self, event):
+        dispatch = _Dispatch(event)
+        for handler in self.handlers.get(event['type'], []):
+            step = getattr(handler, '__name__', repr(handler))
+            if step in event['done']:
+                continue
+            is_deferred = getattr(handler, 'deferred', False)
+            if is_deferred:
+                with self._lock:
+                    dispatch.waiting.add(step)
+            try:
+                if is_deferred:
+                    handler(event['payload'], self._acknowledger(dispatch, step))
+                else:
+                    handler(event['payload'])
+            except Exception as e:
+                with self._lock:
+                    dispatch.waiting.discard(step)
+                    dispatch.failure = (step, e)
+                break
+            if not is_deferred:
+                self.outbox.mark_step_done(event, step)
+
+        with self._lock:
+            dispatch.running = False
+        self._finish(dispatch)
+
+    def _acknowledger(self, dispatch, step):
+        def done(error=None):
+            if error is None:
+                self.outbox.mark_step_done(dispatch.event, step)
+            with self._lock:
+                dispatch.waiting.discard(step)
+                if error is not None and dispatch.failure is None:
+                    dispatch.failure = (step, error)
+            self._finish(dispatch)
+        return done
+
+    def _finish(self, dispatch):
+        """Complete or reschedule the event once no step is running or awaiting acknowledgement"""
+        with self._lock:
+            if dispatch.running or dispatch.waiting or dispatch.finished:
+                return
+            dispatch.finished = True
+        event = dispatch.event
+        if dispatch.failure:
+            self._handle_failure(event, *dispatch.failure)
+            return
+
+        self.outbox.complete(event)
+        with self._lock:
+            self.dispatched += 1
+            self.last_lag = (datetime.utcnow() - event['created_at']).total_seconds()
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+    def _handle_failure(self, event, step, error):
+        message = f"{step}: {error}"
+        attempts = event['attempts'] + 1
+        if attempts >= self.max_attempts:
+            with self._lock:
+                self.failed += 1
+            self.outbox.fail(event, message)
+            print(f"Outbox event {event['_id']} failed after {attempts} attempts: {message}")
+        else:
+            with self._lock:
+                self.retried += 1
+            self.outbox.retry_later(event, message, min(2 ** attempts, self.max_backoff))
+
+    def stats(self):
+        pending, failed, oldest_age = self.outbox.backlog()
+        return {
+            'pending': pending,
+            'failed': failed,
+            'lag_seconds': oldest_age,
+            'last_dispatch_lag_seconds': round(self.last_lag, 3),
+            'max_dispatch_lag_seconds': round(self.max_lag, 3),
+            'dispatched': self.dispatched,
+            'retried': self.retried,
+            'failed_total': self.failed
+        }
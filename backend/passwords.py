@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Werkzeug method string with its cost parameters, e.g. pbkdf2:sha256:600000 or scrypt:32768:8:1
+PASSWORD_METHOD_ENV = 'PASSWORD_HASH_METHOD'
+PASSWORD_WORKERS_ENV = 'PASSWORD_HASH_WORKERS'
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503 and let the client retry"""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    """(matches, new hash if the stored one was made with other parameters)"""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split('$', 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    """Password hashing and checking on a small process pool instead of the request thread.
+
+    The request thread hands the work off and waits on the future without
+    holding the GIL (or, under eventlet/gevent, while other greenlets run),
+    so a burst of logins no longer stalls websocket and listing traffic in
+    the same worker. At most `max_pending` hashes are queued; past that
+    callers get PasswordHasherBusy rather than piling up. A pool broken by a
+    dead worker is replaced and the call retried once on the new one.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=64, wait_timeout=5):
+        if method.split(':', 1)[0] not in ('pbkdf2', 'scrypt'):
+            raise ValueError(f"Unsupported password hash method {method!r}; use pbkdf2:... or scrypt:...")
+        # Werkzeug fills in default parameters ('scrypt' is stored as scrypt:32768:8:1); compare
+        # against what it actually stores, or every login would look outdated and rehash
+        self.method = generate_password_hash('', method=method).split('$', 1)[0]
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.pool_restarts = 0
+
+    def _executor(self, broken=None):
+        """The worker pool; passing the pool that turned out broken replaces it (once)"""
+        with self._lock:
+            if self._pool is not None and self._pool is broken:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self.pool_restarts += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Too many sign-ins in progress, please retry shortly')
+        try:
+            pool = self._executor()
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # Hashing has no side effects, so the call is simply repeated on a fresh pool
+                return self._executor(broken=pool).submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        result = self._run(_hash, password, self.method)
+        with self._lock:
+            self.hashed += 1
+        return result
+
+    def verify(self, stored_hash, password):
+        """(matches, replacement hash or None); a replacement means the cost parameters changed"""
+        matches, new_hash = self._run(_verify, stored_hash, password, self.method)
+        with self._lock:
+            self.verified += 1
+            if new_hash:
+                self.rehashed += 1
+        return matches, new_hash
+
+    def stats(self):
+        with self._lock:
+            return {
+                'method': self.method.split(':', 1)[0],
+                'workers': self.workers,
+                'hashed': self.hashed,
+                'verified': self.verified,
+                'rehashed': self.rehashed,
+                'rejected': self.rejected,
+                'pool_restarts': self.pool_restarts
+            }
+
+
+def authenticate(users_collection, hasher, email, password):
+    """The user document if the password matches, else None; upgrades outdated hashes in place"""
+    user = users_collection.find_one({'email': email})
+    if not user:
+        return None
+    matches, new_hash = hasher.verify(user['password'], password)
+    if not matches:
+        return None
+    if new_hash:
+        # Only if nobody changed the password meanwhile
+        users_collection.update_one({'_id': user['_id'], 'password': user['password']},
+                                    {'$set': {'password': new_hash}})
+        user['password'] = new_hash
+    return user
@@ -0,0 +1,59 @@
+"""
+Production entry point for the Socket.IO backends.
+
+Usage (from backend/):
+    python serve.py app --mode eventlet --port 5000
+    python serve.py user_app --mode gevent --port 5000
+    python serve.py app --mode threading
+
+Modes:
+    threading  standard threads on the Werkzeug server (what `python app.py` uses)
+    eventlet   green threads; needs `pip install eventlet` (maintenance mode upstream)
+    gevent     green threads; needs `pip install gevent gevent-websocket` (preferred)
+
+eventlet and gevent monkey-patch the standard library before the app module
+is imported, so pymongo, smtplib, requests and the background workers
+(outbox dispatcher, mailer, digest, notification bridge) all become
+cooperative and thousands of idle websockets cost a greenlet each instead of
+an OS thread.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+ASYNC_MODES = ('threading', 'eventlet', 'gevent')
+
+
+def monkey_patch(mode):
+    """Make blocking standard library I/O cooperative; must run before the app is imported"""
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a Civic Issue Socket.IO backend')
+    parser.add_argument('app', choices=['app', 'user_app'], help='Backend module to serve')
+    parser.add_argument('--mode', choices=ASYNC_MODES, default=os.environ.get('SOCKETIO_ASYNC_MODE', 'threading'))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    args = parser.parse_args(argv)
+
+    monkey_patch(args.mode)
+    # Read by realtime.create_socketio when the app module builds its SocketIO
+    os.environ['SOCKETIO_ASYNC_MODE'] = args.mode
+    module = importlib.import_module(args.app)
+
+    options = {'allow_unsafe_werkzeug': True} if args.mode == 'threading' else {}
+    print(f"Serving {args.app} on {args.host}:{args.port} ({args.mode})")
+    module.socketio.run(module.app, host=args.host, port=args.port, debug=False, **options)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
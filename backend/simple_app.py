@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_socketio import SocketIO, emit, join_room, leave_room
@@ -9,10 +9,13 @@ import os
 import uuid
 import json
 
+from uploads import configure_upload_serving, serve_upload
+
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['UPLOAD_FOLDER'] = 'uploads'
+configure_upload_serving(app)
 
 # Initialize extensions
 jwt = JWTManager(app)
@@ -279,9 +282,9 @@ def handle_join_room(data):
     emit('joined_room', {'room': room})
 
 # Serve uploaded files
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(app.config['UPLOAD_FOLDER'], filename)
 
 if __name__ == '__main__':
     print("🚀 Starting Civic Issue Reporting System (Simple Version)")
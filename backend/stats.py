@@ -0,0 +1,71 @@
+from pymongo import UpdateOne
+
+STATS_COLLECTION = 'issue_stats'
+
+
+def record_new_issue(stats_collection, category, status='Pending'):
+    """Count a newly reported issue"""
+    stats_collection.update_one(
+        {'_id': category},
+        {'$inc': {'total': 1, f'statuses.{status}': 1}},
+        upsert=True
+    )
+
+
+def record_bulk_status_changes(stats_collection, changes, session=None):
+    """Apply {(category, old_status, new_status): count} moves in one bulk write"""
+    operations = [
+        UpdateOne({'_id': category}, {'$inc': {f'statuses.{old_status}': -count, f'statuses.{new_status}': count}},
+                  upsert=True)
+        for (category, old_status, new_status), count in changes.items()
+        if old_status != new_status
+    ]
+    if operations:
+        stats_collection.bulk_write(operations, ordered=False, session=session)
+
+
+def read_stats(stats_collection, category=None):
+    """Dashboard counters: totals, per-status and per-category breakdowns.
+
+    Reads one small document per category, independent of the number of issues.
+    """
+    query = {'_id': category} if category else {}
+    by_category = {}
+    by_status = {}
+    total = 0
+    for doc in stats_collection.find(query):
+        statuses = {status: count for status, count in doc.get('statuses', {}).items() if count}
+        by_category[doc['_id']] = {'total': doc.get('total', 0), 'statuses': statuses}
+        total += doc.get('total', 0)
+        for status, count in statuses.items():
+            by_status[status] = by_status.get(status, 0) + count
+    return {'total': total, 'by_status': by_status, 'by_category': by_category}
+
+
+def rebuild_stats(issues_collection, stats_collection):
+    """Reconcile the counters with the issues collection using one aggregation.
+
+    Intended to run periodically (e.g. nightly) or after manual data fixes;
+    returns the rebuilt per-category counts.
+    """
+    pipeline = [
+        {'$group': {'_id': {'category': '$category', 'status': '$status'}, 'count': {'$sum': 1}}},
+        {'$group': {
+            '_id': '$_id.category',
+            'total': {'$sum': '$count'},
+            'statuses': {'$push': {'k': '$_id.status', 'v': '$count'}}
+        }},
+        {'$project': {'total': 1, 'statuses': {'$arrayToObject': '$statuses'}}}
+    ]
+    rebuilt = {doc['_id']: doc for doc in issues_collection.aggregate(pipeline) if doc['_id'] is not None}
+
+    for category, doc in rebuilt.items():
+        stats_collection.replace_one({'_id': category}, doc, upsert=True)
+    stats_collection.delete_many({'_id': {'$nin': list(rebuilt)}})
+    return rebuilt
+
+
+def ensure_stats(issues_collection, stats_collection):
+    """Seed the counters on first start against a database that predates them"""
+    if stats_collection.estimated_document_count() == 0 and issues_collection.estimated_document_count() > 0:
+        rebuild_stats(issues_collection, stats_collection)
@@ -0,0 +1,335 @@
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateMany
+
+from outbox import deferred
+from stats import record_bulk_status_changes
+
+VALID_STATUSES = ['Pending', 'In Progress', 'Resolved']
+
+# Fields the side effects need; returned by the update itself
+ISSUE_FIELDS = {'title': 1, 'user_id': 1, 'category': 1, 'status': 1, 'previous_status': 1}
+
+
+class StatusUpdateError(Exception):
+    """A status transition that was rejected, with the HTTP status to answer with"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def updated_by_label(actor, actor_role, category=None):
+    name = actor['name'] if actor else 'Unknown'
+    if actor_role == 'staff':
+        return f"{name} ({category} Staff)"
+    return f"{name} (Administrator)"
+
+
+EMAIL_FOOTER = """
+                <p>Thank you for helping improve our community by reporting this issue.</p>
+
+                <p>Best regards,<br>
+                Civic Issue Reporting System</p>
+            </body>
+            </html>
+            """
+
+
+def render_status_email(transition):
+    """Return (subject, html body) for the reporter's status update email"""
+    issue = transition['issue']
+    reporter = transition['reporter']
+    subject = f"Issue Status Update - {issue['title']}"
+    body = f"""
+            <html>
+            <body>
+                <h2>Your Civic Issue Status Has Been Updated</h2>
+                <p>Dear {reporter['name']},</p>
+
+                <p>We wanted to inform you that the status of your reported issue has been updated:</p>
+
+                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                    <h3>Issue Details:</h3>
+                    <p><strong>Title:</strong> {issue['title']}</p>
+                    <p><strong>New Status:</strong> <span style="color: #007bff; font-weight: bold;">{transition['status']}</span></p>
+                    <p><strong>Updated by:</strong> {transition['updated_by']}</p>
+                    <p><strong>Date:</strong> {transition['updated_at'].strftime('%B %d, %Y at %I:%M %p')}</p>
+                </div>
+""" + EMAIL_FOOTER
+    return subject, body
+
+
+def status_change(transition):
+    previous = transition.get('previous_status')
+    if previous and previous != transition['status']:
+        return f"{previous} &rarr; <strong>{transition['status']}</strong>"
+    return f"<strong>{transition['status']}</strong>"
+
+
+def render_bulk_status_email(transitions):
+    """Return (subject, html body) summarising several updates for one reporter (bulk actions, digests)"""
+    if len(transitions) == 1:
+        return render_status_email(transitions[0])
+    reporter = transitions[0]['reporter']
+    rows = ''.join(
+        f"""
+                    <tr><td>{t['issue']['title']}</td><td>{status_change(t)}</td><td>{t['updated_by']}</td></tr>"""
+        for t in transitions
+    )
+    subject = f"Status Update - {len(transitions)} of your issues"
+    body = f"""
+            <html>
+            <body>
+                <h2>Your Civic Issues Have Been Updated</h2>
+                <p>Dear {reporter['name']},</p>
+
+                <p>The status of {len(transitions)} of your reported issues has been updated:</p>
+
+                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                    <table cellpadding="6">
+                    <tr><th align="left">Issue</th><th align="left">Status</th><th align="left">Updated by</th></tr>{rows}
+                    </table>
+                    <p><strong>Date:</strong> {transitions[-1]['updated_at'].strftime('%B %d, %Y at %I:%M %p')}</p>
+                </div>
+""" + EMAIL_FOOTER
+    return subject, body
+
+
+# Outbox event type written by every status change (single or bulk)
+STATUS_EVENT = 'issue_status_changed'
+
+
+class IssueStatusService:
+    """Applies issue status transitions for the admin and staff routes.
+
+    The request performs the issue update, moves the dashboard counters and
+    writes one outbox event, inside a transaction when the deployment
+    supports them. The staff category guard is part of the update filter, so
+    no pre-read is needed. Everything else -- notification documents and the
+    app-specific side effects (email, sockets, ...) -- runs in the outbox
+    dispatcher via `event_handlers()`. Side effects receive the list of
+    transitions made by one request, so bulk updates can coalesce their work.
+
+    `on_commit` callables run inline with the updated issue documents and are
+    meant for cheap in-process work such as cache invalidation.
+    """
+
+    MAX_BULK_SIZE = 1000
+
+    def __init__(self, issues_collection, notifications_collection, stats_collection, user_cache, outbox,
+                 side_effects=(), on_commit=(), use_transactions=False):
+        self.issues_collection = issues_collection
+        self.notifications_collection = notifications_collection
+        self.stats_collection = stats_collection
+        self.user_cache = user_cache
+        self.outbox = outbox
+        self.side_effects = list(side_effects)
+        self.on_commit = list(on_commit)
+        self.use_transactions = use_transactions
+
+    def _update(self, new_status, actor_id, actor_role, now):
+        # Pipeline update: previous_status captures the old value in the same write
+        return [{'$set': {
+            'previous_status': '$status',
+            'status': {'$literal': new_status},
+            'updated_at': now,
+            'updated_by': actor_id,
+            'updated_by_role': actor_role
+        }}]
+
+    def _write(self, callback):
+        """Run callback(session) in a transaction when available, else without a session"""
+        if not self.use_transactions:
+            return callback(None)
+        with self.issues_collection.database.client.start_session() as session:
+            return session.with_transaction(callback)
+
+    def _record_counters(self, issues, new_status, session):
+        """Move the dashboard counters in the same write as the issues, never twice"""
+        changes = {}
+        for issue in issues:
+            key = (issue['category'], issue.get('previous_status'), new_status)
+            if key[1]:
+                changes[key] = changes.get(key, 0) + 1
+        record_bulk_status_changes(self.stats_collection, changes, session=session)
+
+    def _record_event(self, issues, new_status, actor_id, actor_role, now, session):
+        self.outbox.add(STATUS_EVENT, {
+            'issues': issues,
+            'status': new_status,
+            'actor_id': actor_id,
+            'actor_role': actor_role,
+            'updated_at': now
+        }, session=session)
+
+    def _committed(self, issues):
+        for hook in self.on_commit:
+            try:
+                hook(issues)
+            except Exception as e:
+                print(f"Status update hook {getattr(hook, '__name__', hook)} failed: {e}")
+        self.outbox.notify()
+
+    @staticmethod
+    def _check_scope(actor_role, category):
+        # Staff are always limited to a category; a token without one must not become unrestricted
+        if actor_role == 'staff' and not category:
+            raise StatusUpdateError('Staff category not found', 403)
+
+    def transition(self, issue_id, new_status, actor_id, actor_role, category=None):
+        """Move an issue to new_status; category restricts the update to that category (staff).
+
+        Returns the updated issue document.
+        """
+        self._check_scope(actor_role, category)
+        if new_status not in VALID_STATUSES:
+            raise StatusUpdateError(f'Invalid status. Must be one of: {VALID_STATUSES}', 400)
+        try:
+            object_id = ObjectId(issue_id)
+        except (InvalidId, TypeError):
+            raise StatusUpdateError('Invalid issue_id', 400)
+
+        query = {'_id': object_id}
+        if category:
+            query['category'] = category
+        now = datetime.utcnow()
+
+        def write(session):
+            issue = self.issues_collection.find_one_and_update(
+                query,
+                self._update(new_status, actor_id, actor_role, now),
+                projection=ISSUE_FIELDS,
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if issue is not None:
+                self._record_counters([issue], new_status, session)
+                self._record_event([issue], new_status, actor_id, actor_role, now, session)
+            return issue
+
+        issue = self._write(write)
+        if issue is None:
+            # Only the failure path pays for a second lookup
+            if category and self.issues_collection.count_documents({'_id': object_id}, limit=1):
+                raise StatusUpdateError('Access denied. Issue not in your category.', 403)
+            raise StatusUpdateError('Issue not found', 404)
+
+        self._committed([issue])
+        return issue
+
+    def bulk_transition(self, issue_ids, new_status, actor_id, actor_role, category=None):
+        """Move many issues to new_status in one round trip.
+
+        Returns (issues, skipped_ids); issues that do not exist, are outside
+        `category` or already have new_status are skipped.
+        """
+        self._check_scope(actor_role, category)
+        if new_status not in VALID_STATUSES:
+            raise StatusUpdateError(f'Invalid status. Must be one of: {VALID_STATUSES}', 400)
+        if not isinstance(issue_ids, list) or not issue_ids:
+            raise StatusUpdateError('issue_ids must be a non-empty list', 400)
+        if len(issue_ids) > self.MAX_BULK_SIZE:
+            raise StatusUpdateError(f'At most {self.MAX_BULK_SIZE} issues can be updated at once', 400)
+        try:
+            object_ids = list({ObjectId(issue_id) for issue_id in issue_ids})
+        except (InvalidId, TypeError):
+            raise StatusUpdateError('Invalid issue id in issue_ids', 400)
+
+        query = {'_id': {'$in': object_ids}, 'status': {'$ne': new_status}}
+        if category:
+            query['category'] = category
+        now = datetime.utcnow()
+
+        def write(session):
+            issues = list(self.issues_collection.find(query, ISSUE_FIELDS, session=session))
+            if not issues:
+                return issues
+            by_status = {}
+            for issue in issues:
+                by_status.setdefault(issue.get('status'), []).append(issue)
+            # One round trip; each UpdateMany only matches issues still in the status read
+            # above, so previous_status (and the counters built from it) is exact
+            update = self._update(new_status, actor_id, actor_role, now)
+            result = self.issues_collection.bulk_write([
+                UpdateMany({**query, '_id': {'$in': [issue['_id'] for issue in group]}, 'status': status}, update)
+                for status, group in by_status.items()
+            ], ordered=False, session=session)
+            if result.modified_count < len(issues):
+                # Some changed status in between: keep only the ones this write moved
+                moved = {doc['_id'] for doc in self.issues_collection.find(
+                    {'_id': {'$in': [issue['_id'] for issue in issues]}, 'status': new_status,
+                     'updated_at': now, 'updated_by': actor_id}, {'_id': 1}, session=session)}
+                issues = [issue for issue in issues if issue['_id'] in moved]
+                if not issues:
+                    return issues
+            for issue in issues:
+                issue['previous_status'] = issue.get('status')
+                issue['status'] = new_status
+            self._record_counters(issues, new_status, session)
+            self._record_event(issues, new_status, actor_id, actor_role, now, session)
+            return issues
+
+        issues = self._write(write)
+        skipped = sorted({str(issue_id) for issue_id in issue_ids} - {str(issue['_id']) for issue in issues})
+        if issues:
+            self._committed(issues)
+        return issues, skipped
+
+    # Dispatcher side: one handler per step, so a retry skips the steps that succeeded
+
+    def build_transitions(self, payload):
+        issues = payload['issues']
+        actor_id, actor_role = payload['actor_id'], payload['actor_role']
+        profiles = self.user_cache.get_many([actor_id] + [issue['user_id'] for issue in issues])
+        actor = profiles.get(str(actor_id))
+        return [{
+            'issue_id': str(issue['_id']),
+            'issue': issue,
+            'previous_status': issue.get('previous_status'),
+            'status': payload['status'],
+            'actor': actor,
+            'actor_role': actor_role,
+            'updated_by': updated_by_label(actor, actor_role, issue['category']),
+            'reporter': profiles.get(issue['user_id']),
+            'updated_at': payload['updated_at']
+        } for issue in issues]
+
+    def _notification(self, transition):
+        issue = transition['issue']
+        return {
+            'user_id': issue['user_id'],
+            'type': 'issue_status',
+            'title': 'Issue Status Updated',
+            'message': f"Your issue '{issue['title']}' is now {transition['status']} (Updated by {transition['updated_by']})",
+            'issue_id': transition['issue_id'],
+            'status': transition['status'],
+            'read': False,
+            'created_at': transition['updated_at']
+        }
+
+    def event_handlers(self):
+        """{event type: [handler(payload)]} for the OutboxDispatcher"""
+        def insert_notifications(payload):
+            transitions = self.build_transitions(payload)
+            self.notifications_collection.insert_many([self._notification(t) for t in transitions], ordered=False)
+
+        handlers = [insert_notifications]
+        for effect in self.side_effects:
+            handlers.append(self._side_effect_handler(effect))
+        return {STATUS_EVENT: handlers}
+
+    def _side_effect_handler(self, effect):
+        if getattr(effect, 'deferred', False):
+            # Acknowledged later: effect(transitions, done), see outbox.deferred
+            @deferred
+            def handler(payload, done):
+                effect(self.build_transitions(payload), done)
+        else:
+            def handler(payload):
+                effect(self.build_transitions(payload))
+        handler.__name__ = getattr(effect, '__name__', repr(effect))
+        return handler
@@ -0,0 +1,157 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+from uploads import resolve_upload
+
+# Longest edge in pixels for each variant; listings use 'thumb', detail views 'medium'
+VARIANTS = {'thumb': 320, 'medium': 1280}
+WEBP_QUALITY = 80
+
+
+def variant_filename(filename, name):
+    return f"{os.path.splitext(filename)[0]}_{name}.webp"
+
+
+def make_variants(folder, filename):
+    """Write the resized WebP variants of uploads/<filename>; returns {variant name: relative path}.
+
+    Runs in a worker process. Orientation from EXIF is applied to the pixels,
+    then the metadata is dropped (WebP is saved without exif/GPS). Variants
+    that already exist are kept, so identical uploads and re-runs are cheap.
+    """
+    variants = {}
+    source = None
+    # Variants sit next to the original, in its shard once the layout is migrated
+    path = resolve_upload(folder, filename)
+    try:
+        for name, max_edge in VARIANTS.items():
+            target = variant_filename(path, name)
+            variants[name] = target
+            target_path = os.path.join(folder, target)
+            if os.path.exists(target_path):
+                continue
+            if source is None:
+                source = ImageOps.exif_transpose(Image.open(os.path.join(folder, path)))
+                if source.mode not in ('RGB', 'RGBA'):
+                    source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+            image = source.copy()
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            temp_path = f"{target_path}.tmp"
+            image.save(temp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(temp_path, target_path)
+    finally:
+        if source is not None:
+            source.close()
+    return variants
+
+
+def record_variants(issues_collection, uploads_collection, filename, variants):
+    """Point every issue using the image (and its upload record) at the variants"""
+    issues_collection.update_many({'image': filename}, {'$set': {'image_variants': variants}})
+    uploads_collection.update_one({'filename': filename}, {'$set': {'variants': variants}})
+
+
+class ThumbnailPipeline:
+    """Resizes report images in a process pool after submit_report has stored them.
+
+    The request only queues the work; when a worker finishes, the variant
+    filenames are recorded on the issues that use the image. A pool broken by
+    a dying worker (e.g. killed for memory) is replaced, and failed jobs are
+    resubmitted up to `max_attempts` times after `retry_delay` seconds.
+    """
+
+    def __init__(self, folder, issues_collection, uploads_collection, workers=2, on_recorded=None,
+                 max_attempts=3, retry_delay=5):
+        self.folder = folder
+        self.issues_collection = issues_collection
+        self.uploads_collection = uploads_collection
+        self.workers = workers
+        # on_recorded(category) runs once the issues point at their variants, e.g. to drop cached listings
+        self.on_recorded = on_recorded
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._pool = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.pool_restarts = 0
+
+    def _executor(self, broken=None):
+        """The worker pool; passing the pool that turned out broken replaces it (once)"""
+        with self._lock:
+            if self._pool is not None and self._pool is broken:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self.pool_restarts += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def submit(self, filename, category=None, attempt=1):
+        pool = self._executor()
+        try:
+            future = pool.submit(make_variants, self.folder, filename)
+        except BrokenProcessPool:
+            pool = self._executor(broken=pool)
+            future = pool.submit(make_variants, self.folder, filename)
+        future.add_done_callback(lambda done: self._finished(filename, category, attempt, pool, done))
+        return future
+
+    def _finished(self, filename, category, attempt, pool, future):
+        try:
+            variants = future.result()
+            record_variants(self.issues_collection, self.uploads_collection, filename, variants)
+            self.completed += 1
+            if self.on_recorded:
+                self.on_recorded(category)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._executor(broken=pool)
+            if attempt < self.max_attempts:
+                self.retried += 1
+                print(f"Thumbnail generation failed for {filename} (attempt {attempt}), retrying: {e}")
+                timer = threading.Timer(self.retry_delay, self._retry, args=(filename, category, attempt + 1))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.failed += 1
+                print(f"Thumbnail generation failed for {filename}: {e}")
+
+    def _retry(self, filename, category, attempt):
+        try:
+            self.submit(filename, category, attempt)
+        except Exception as e:
+            self.failed += 1
+            print(f"Thumbnail generation failed for {filename}: {e}")
+
+    def stats(self):
+        return {'workers': self.workers, 'completed': self.completed, 'failed': self.failed,
+                'retried': self.retried, 'pool_restarts': self.pool_restarts}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+def backfill(folder, issues_collection, uploads_collection, workers=None):
+    """Create variants for issues whose image has none yet; returns (images processed, failures)"""
+    filenames = issues_collection.distinct('image', {'image': {'$nin': [None, '']},
+                                                     'image_variants': {'$exists': False}})
+    filenames = [filename for filename in filenames
+                 if os.path.exists(os.path.join(folder, resolve_upload(folder, filename)))]
+    processed = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(make_variants, folder, filename): filename for filename in filenames}
+        for future, filename in futures.items():
+            try:
+                record_variants(issues_collection, uploads_collection, filename, future.result())
+                processed += 1
+            except Exception as e:
+                failed += 1
+                print(f"  {filename}: {e}")
+    return processed, failed
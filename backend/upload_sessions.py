@@ -0,0 +1,217 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from uploads import CHUNK_SIZE, MAX_UPLOAD_BYTES, UploadError, check_image, place_upload, record_upload
+
+UPLOAD_SESSIONS_COLLECTION = 'upload_sessions'
+# Small enough that a chunk usually gets through on a flaky 3G link, large enough to keep requests few
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# Partial files live under uploads/.sessions/, which is never served or migrated
+SESSIONS_DIR = '.sessions'
+
+
+class ChunkOffsetMismatch(UploadError):
+    """A chunk that does not start at the session's current offset; the client resumes from `offset`"""
+
+    def __init__(self, message, offset):
+        super().__init__(message, 409)
+        self.offset = offset
+
+    def to_dict(self):
+        return {**super().to_dict(), 'offset': self.offset}
+
+
+class UploadSessions:
+    """Resumable image uploads: initiate, send chunk N, complete, then attach to a report.
+
+    Chunks are written in place into uploads/.sessions/<id>.part and the
+    session document tracks how many bytes are safely on disk, so after a
+    dropped connection the client asks for the offset and sends only the
+    rest. A completed upload is moved into the content-addressed store when
+    submit_report attaches it. Sessions idle for longer than `ttl_seconds`
+    are garbage-collected together with their partial files.
+    """
+
+    def __init__(self, collection, folder, uploads_collection, chunk_size=UPLOAD_CHUNK_BYTES,
+                 max_bytes=MAX_UPLOAD_BYTES, ttl_seconds=24 * 3600, max_open_per_user=5):
+        self.collection = collection
+        self.folder = folder
+        self.uploads_collection = uploads_collection
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_open_per_user = max_open_per_user
+        self.sessions_folder = os.path.join(folder, SESSIONS_DIR)
+        os.makedirs(self.sessions_folder, exist_ok=True)
+        self._reaper = None
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.sessions_folder, f"{upload_id}.part")
+
+    @staticmethod
+    def _state(session):
+        return {
+            'upload_id': session['_id'],
+            'size': session['size'],
+            'chunk_size': session['chunk_size'],
+            'offset': session['offset'],
+            'complete': session['status'] != 'open'
+        }
+
+    def _get(self, upload_id, user_id):
+        session = self.collection.find_one({'_id': upload_id, 'user_id': user_id})
+        if session is None:
+            raise UploadError('Upload session not found or expired', 404)
+        return session
+
+    def create(self, user_id, size):
+        """Start a session for an image of `size` bytes"""
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise UploadError('size must be an integer')
+        if size <= 0:
+            raise UploadError('size must be positive')
+        if size > self.max_bytes:
+            raise UploadError(f'Image is larger than {self.max_bytes // (1024 * 1024)} MB', 413)
+        if self.collection.count_documents({'user_id': user_id, 'status': 'open'}) >= self.max_open_per_user:
+            raise UploadError('Too many unfinished uploads; complete or wait for them to expire', 429)
+
+        now = datetime.utcnow()
+        session = {
+            '_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'size': size,
+            'chunk_size': self.chunk_size,
+            'offset': 0,
+            'status': 'open',
+            'created_at': now,
+            'updated_at': now
+        }
+        open(self._part_path(session['_id']), 'wb').close()
+        self.collection.insert_one(session)
+        return self._state(session)
+
+    def status(self, upload_id, user_id):
+        return self._state(self._get(upload_id, user_id))
+
+    def write_chunk(self, upload_id, user_id, index, stream, content_length):
+        """Write chunk `index` (bytes index*chunk_size onwards) and return the session state.
+
+        A chunk that was already received is acknowledged without being
+        written again, so retrying after a lost response is harmless.
+        """
+        session = self._get(upload_id, user_id)
+        if session['status'] != 'open':
+            raise UploadError('Upload is already complete', 409)
+        start = index * session['chunk_size']
+        if index < 0 or start >= session['size']:
+            raise UploadError('Chunk index out of range')
+        if start < session['offset']:
+            return self._state(session)
+        if start > session['offset']:
+            raise ChunkOffsetMismatch(f"Expected chunk {session['offset'] // session['chunk_size']}",
+                                      session['offset'])
+        expected = min(session['chunk_size'], session['size'] - start)
+        if content_length != expected:
+            raise UploadError(f'Chunk {index} must be {expected} bytes')
+
+        # Bytes past the recorded offset are not trusted until the offset moves, so a write cut short is simply redone
+        received = 0
+        with open(self._part_path(upload_id), 'r+b') as out:
+            out.seek(start)
+            while received < expected:
+                data = stream.read(min(CHUNK_SIZE, expected - received))
+                if not data:
+                    break
+                out.write(data)
+                received += len(data)
+        if received != expected:
+            raise UploadError(f'Chunk {index} was cut short ({received} of {expected} bytes)')
+
+        updated = self.collection.find_one_and_update(
+            {'_id': upload_id, 'offset': start, 'status': 'open'},
+            {'$set': {'offset': start + expected, 'updated_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        # A concurrent retry of the same chunk got there first; it wrote the same bytes
+        return self._state(updated or self._get(upload_id, user_id))
+
+    def complete(self, upload_id, user_id):
+        """Check that every byte arrived and the file is an image; idempotent"""
+        session = self._get(upload_id, user_id)
+        if session['status'] != 'open':
+            return self._state(session)
+        if session['offset'] < session['size']:
+            raise ChunkOffsetMismatch('Upload is missing chunks', session['offset'])
+
+        part_path = self._part_path(upload_id)
+        digest = hashlib.sha256()
+        with open(part_path, 'r+b') as f:
+            f.truncate(session['size'])
+            for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(data)
+        check_image(part_path)
+
+        session = self.collection.find_one_and_update(
+            {'_id': upload_id, 'status': 'open'},
+            {'$set': {'status': 'complete', 'sha256': digest.hexdigest(), 'updated_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        ) or self._get(upload_id, user_id)
+        return self._state(session)
+
+    def attach(self, upload_id, user_id):
+        """Move a completed upload into the image store for a new report; returns the image metadata"""
+        session = self.collection.find_one_and_update(
+            {'_id': upload_id, 'user_id': user_id, 'status': 'complete'},
+            {'$set': {'status': 'attaching', 'updated_at': datetime.utcnow()}}
+        )
+        if session is None:
+            raise UploadError('Upload not found or not complete')
+        meta = place_upload(self._part_path(upload_id), session['sha256'], session['size'], self.folder)
+        record_upload(self.uploads_collection, meta)
+        self.collection.delete_one({'_id': upload_id})
+        return meta
+
+    def collect_garbage(self):
+        """Delete sessions idle for longer than the TTL and their partial files; returns how many"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        removed = 0
+        for session in self.collection.find({'updated_at': {'$lt': cutoff}}, {'_id': 1}):
+            part_path = self._part_path(session['_id'])
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            removed += self.collection.delete_one({'_id': session['_id'], 'updated_at': {'$lt': cutoff}}).deleted_count
+
+        # Partial files whose session document is already gone (e.g. a crash between the two deletes)
+        cutoff_mtime = time.time() - self.ttl_seconds
+        with os.scandir(self.sessions_folder) as entries:
+            for entry in entries:
+                if entry.name.endswith('.part') and entry.stat().st_mtime < cutoff_mtime:
+                    if self.collection.count_documents({'_id': entry.name[:-len('.part')]}, limit=1) == 0:
+                        os.remove(entry.path)
+        return removed
+
+    def start_reaper(self, interval=600):
+        """Collect abandoned sessions every `interval` seconds on a daemon thread"""
+        if self._reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.collect_garbage()
+                    if removed:
+                        print(f"Removed {removed} abandoned upload session(s)")
+                except Exception as e:
+                    print(f"Upload session cleanup failed: {e}")
+
+        self._reaper = threading.Thread(target=run, name='upload-session-reaper', daemon=True)
+        self._reaper.start()
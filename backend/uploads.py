@@ -0,0 +1,307 @@
+import hashlib
+import mimetypes
+import os
+import re
+import struct
+import tempfile
+from datetime import datetime
+
+from flask import abort, current_app, request, send_from_directory
+from pymongo import UpdateOne
+from werkzeug.security import safe_join
+
+UPLOADS_COLLECTION = 'uploads'
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Multipart boundaries and the other report fields on top of the image itself
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 256 * 1024
+CHUNK_SIZE = 64 * 1024
+# A small compressed file can still decode to gigabytes in the thumbnail workers
+MAX_IMAGE_PIXELS = 40_000_000
+
+IMAGE_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'gif': 'image/gif'}
+FORMAT_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'gif': 'gif'}
+# Files live two directory levels deep, ab/cd/<name>, so no directory holds more than a few thousand
+SHARD_PREFIX = re.compile(r'[0-9a-f]{4}')
+# Issues whose image (or images whose filename) is still a flat, pre-sharding name
+FLAT_NAME = re.compile(r'^[^/]+$')
+# Stored filenames never change content (<sha256>.<ext>, its variants, legacy uuids), so caches keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# 'x-accel' (nginx X-Accel-Redirect) or 'x-sendfile' (Apache/lighttpd) to let the front proxy send the bytes
+UPLOADS_OFFLOAD_ENV = 'UPLOADS_OFFLOAD'
+# nginx `internal` location aliased to the uploads folder
+UPLOADS_ACCEL_PREFIX_ENV = 'UPLOADS_ACCEL_PREFIX'
+# JPEG start-of-frame markers carry the dimensions (C4, C8 and CC are not frames)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class UploadError(Exception):
+    """A rejected upload, with the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {'error': self.message}
+
+
+def _jpeg_dimensions(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Fill bytes before a marker; a file that ends inside them is truncated
+        while marker[1] == 0xFF:
+            next_byte = f.read(1)
+            if not next_byte:
+                return None
+            marker = marker[1:] + next_byte
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            return None
+        if marker[1] in JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_info(path):
+    """(format, width, height) read from the file header, or None if it is not a PNG/JPEG/GIF"""
+    with open(path, 'rb') as f:
+        header = f.read(26)
+        if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', header[16:24])
+            return 'png', width, height
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', header[6:10])
+            return 'gif', width, height
+        if header.startswith(b'\xff\xd8'):
+            dimensions = _jpeg_dimensions(f)
+            if dimensions:
+                return ('jpeg',) + dimensions
+    return None
+
+
+def check_image(path):
+    """image_info(path); raises UploadError if it is no PNG/JPEG/GIF or has too many pixels"""
+    info = image_info(path)
+    if info is None:
+        raise UploadError('Image must be a PNG, JPEG or GIF file')
+    _, width, height = info
+    if width * height > MAX_IMAGE_PIXELS:
+        raise UploadError(f'Image is too large (at most {MAX_IMAGE_PIXELS // 1_000_000} megapixels)', 413)
+    return info
+
+
+def stream_to_disk(stream, folder, max_bytes=MAX_UPLOAD_BYTES):
+    """Copy an upload stream to a temp file in `folder` in chunks, hashing as it goes.
+
+    Returns (temp path, sha256 hex, size); raises UploadError(413) as soon as
+    max_bytes is exceeded, without reading the rest of the stream.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f'Image is larger than {max_bytes // (1024 * 1024)} MB', 413)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def shard_path(name):
+    """Relative sharded path of a stored file: ab/cd/<name>.
+
+    Content-addressed names (and uuid-prefixed legacy ones) shard on their own
+    leading hex digits, so an image and its variants share a directory; other
+    names shard on a hash of the name. Already sharded paths are returned as is.
+    """
+    if '/' in name:
+        return name
+    prefix = name[:4] if SHARD_PREFIX.fullmatch(name[:4]) else hashlib.sha256(name.encode()).hexdigest()[:4]
+    return f"{prefix[:2]}/{prefix[2:]}/{name}"
+
+
+def resolve_upload(folder, name):
+    """Relative path under `folder` holding `name`: sharded if present, else the flat pre-migration file"""
+    sharded = shard_path(name)
+    if sharded == name or os.path.exists(os.path.join(folder, sharded)):
+        return sharded
+    if os.path.exists(os.path.join(folder, name)):
+        return name
+    return sharded
+
+
+def place_upload(temp_path, sha256, size, folder):
+    """Move a fully received temp file to its content-addressed place; returns its metadata.
+
+    The file lands at ab/cd/<sha256>.<ext> (the returned filename); if an
+    identical image is already stored the temp file is just removed.
+    """
+    try:
+        image_format, width, height = check_image(temp_path)
+        filename = shard_path(f"{sha256}.{FORMAT_EXTENSIONS[image_format]}")
+        final_path = os.path.join(folder, filename)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        'sha256': sha256,
+        'filename': filename,
+        'size': size,
+        'width': width,
+        'height': height,
+        'content_type': IMAGE_TYPES[image_format]
+    }
+
+
+def record_upload(uploads_collection, meta):
+    """Count one more issue referencing the stored image"""
+    uploads_collection.update_one(
+        {'_id': meta['sha256']},
+        {'$inc': {'refs': 1}, '$setOnInsert': {**meta, 'created_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def store_upload(file_storage, folder, uploads_collection, max_bytes=MAX_UPLOAD_BYTES):
+    """Store an uploaded image content-addressed and return its metadata for the issue document.
+
+    An identical image that was already uploaded is not written again, only
+    its reference count goes up.
+    """
+    temp_path, sha256, size = stream_to_disk(file_storage.stream, folder, max_bytes)
+    meta = place_upload(temp_path, sha256, size, folder)
+    record_upload(uploads_collection, meta)
+    return meta
+
+
+def configure_upload_serving(app):
+    """Read the offload mode for /uploads from the environment into app.config"""
+    offload = os.environ.get(UPLOADS_OFFLOAD_ENV, '').lower() or None
+    if offload not in (None, 'x-accel', 'x-sendfile'):
+        raise ValueError(f"{UPLOADS_OFFLOAD_ENV} must be 'x-accel' or 'x-sendfile', got {offload!r}")
+    app.config['UPLOADS_OFFLOAD'] = offload
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.environ.get(UPLOADS_ACCEL_PREFIX_ENV, '/_uploads/')
+    # Werkzeug answers with an empty body and an X-Sendfile header instead of streaming the file
+    app.config['USE_X_SENDFILE'] = offload == 'x-sendfile'
+
+
+def serve_upload(folder, filename):
+    """Response for GET /uploads/<filename>: immutable caching, strong ETag, Range support.
+
+    The filename itself is the ETag since it never names different bytes.
+    With UPLOADS_OFFLOAD=x-accel the worker only answers headers and nginx
+    streams the file (and any Range of it) from the internal location.
+    Flat pre-sharding names are served from wherever the file is now.
+    """
+    # Temp files and unfinished resumable uploads (.sessions/) are never public
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+    filename = resolve_upload(folder, filename)
+    if current_app.config.get('UPLOADS_OFFLOAD') != 'x-accel':
+        response = send_from_directory(folder, filename, etag=filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
+
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.set_etag(filename)
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    response = response.make_conditional(request)
+    if response.status_code == 200:
+        response.headers['X-Accel-Redirect'] = current_app.config['UPLOADS_ACCEL_PREFIX'] + filename
+    return response
+
+
+def _sharded_variants(variants):
+    return {name: shard_path(variant) for name, variant in (variants or {}).items()}
+
+
+def _flush(collection, operations):
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def migrate_to_sharded(folder, issues_collection, uploads_collection, batch_size=500):
+    """Move flat files in `folder` into ab/cd/ shards, then rewrite image references in bulk.
+
+    Idempotent and resumable: files already in a shard and documents already
+    pointing at sharded paths are left alone, so an interrupted run can simply
+    be started again. Files move before documents change, and serve_upload
+    resolves flat names either way, so images keep loading throughout.
+    Returns (files moved, issues rewritten, upload records rewritten).
+    """
+    moved = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # Temp files from in-flight uploads start with a dot
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            target = os.path.join(folder, shard_path(entry.name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                # Same name, same bytes: the sharded copy was written by a newer upload
+                os.remove(entry.path)
+            else:
+                os.replace(entry.path, target)
+            moved += 1
+
+    issues_rewritten = 0
+    operations = []
+    for issue in issues_collection.find({'image': FLAT_NAME}, {'image': 1, 'image_meta': 1, 'image_variants': 1}):
+        update = {'image': shard_path(issue['image'])}
+        if issue.get('image_meta'):
+            update['image_meta.filename'] = shard_path(issue['image_meta']['filename'])
+        if issue.get('image_variants'):
+            update['image_variants'] = _sharded_variants(issue['image_variants'])
+        operations.append(UpdateOne({'_id': issue['_id']}, {'$set': update}))
+        if len(operations) >= batch_size:
+            issues_rewritten += _flush(issues_collection, operations)
+            operations = []
+    issues_rewritten += _flush(issues_collection, operations)
+
+    uploads_rewritten = 0
+    operations = []
+    for upload in uploads_collection.find({'filename': FLAT_NAME}, {'filename': 1, 'variants': 1}):
+        update = {'filename': shard_path(upload['filename'])}
+        if upload.get('variants'):
+            update['variants'] = _sharded_variants(upload['variants'])
+        operations.append(UpdateOne({'_id': upload['_id']}, {'$set': update}))
+        if len(operations) >= batch_size:
+            uploads_rewritten += _flush(uploads_collection, operations)
+            operations = []
+    uploads_rewritten += _flush(uploads_collection, operations)
+    return moved, issues_rewritten, uploads_rewritten
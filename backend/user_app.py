@@ -1,31 +1,83 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, session
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from flask_socketio import emit, join_room, leave_room
 from bson import ObjectId
 from datetime import datetime, timedelta
 import os
-import uuid
 
+from auth import TOKEN_REVOCATIONS_COLLECTION, RevocationList
+from cache import FilterKeyedCache, ResponseCache, UserProfileCache, conditional_json_response
 from common import initialize_database
+from geo import (cluster_issues, find_nearby, find_within, make_point, parse_bbox, parse_map_limit,
+                 parse_zoom, MAX_RADIUS_METERS)
+from listing import address_prefixes, list_issues, parse_page_args, present_issues
+from passwords import (DEFAULT_METHOD, PASSWORD_METHOD_ENV, PASSWORD_WORKERS_ENV, PasswordHasher,
+                       PasswordHasherBusy, authenticate)
+from realtime import ISSUE_CACHE_EVENT, RealtimeDelivery, create_socketio, rooms_for_token, user_room
+from stats import STATS_COLLECTION, read_stats, record_new_issue
+from thumbnails import ThumbnailPipeline
+from upload_sessions import UPLOAD_SESSIONS_COLLECTION, UploadSessions
+from uploads import (MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES, UPLOADS_COLLECTION, UploadError,
+                     configure_upload_serving, serve_upload, store_upload)
 
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+configure_upload_serving(app)
 
 jwt = JWTManager(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = create_socketio(app, cors_allowed_origins="*")
+realtime = RealtimeDelivery(socketio)
 
 client, db, users_collection, issues_collection, notifications_collection = initialize_database()
+user_cache = UserProfileCache(users_collection, max_entries=10000, ttl=300)
+# Tokens revoked by a role change or forced logout are refused here too
+revocations = RevocationList(db[TOKEN_REVOCATIONS_COLLECTION], token_lifetime=app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+revocations.install(jwt)
+revocations.start()
+stats_collection = db[STATS_COLLECTION]
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+uploads_collection = db[UPLOADS_COLLECTION]
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# Serialized /issues responses keyed by filter; invalidated by report/status writes
+issues_cache = ResponseCache(max_entries=256)
+# Map cluster tiles keyed by (category, status, zoom, tile x, tile y)
+cluster_cache = FilterKeyedCache(max_entries=4096)
+
+
+def invalidate_local_issue_caches(category=None, statuses=()):
+    issues_cache.invalidate(category=category, statuses=statuses)
+    cluster_cache.invalidate(category=category, statuses=statuses)
+
+
+def invalidate_issue_caches(category=None, statuses=()):
+    # Every worker sharing the Socket.IO message queue drops its copies too
+    realtime.publish_app_event(ISSUE_CACHE_EVENT, {'category': category, 'statuses': list(statuses)})
+
+
+realtime.on_app_event(ISSUE_CACHE_EVENT,
+                      lambda data: invalidate_local_issue_caches(data['category'], tuple(data['statuses'])))
+
+
+# Password hashing off the request thread; changing PASSWORD_HASH_METHOD rehashes users as they log in
+password_hasher = PasswordHasher(method=os.environ.get(PASSWORD_METHOD_ENV, DEFAULT_METHOD),
+                                 workers=int(os.environ.get(PASSWORD_WORKERS_ENV, 2)))
+
+# Resumable chunked uploads for flaky mobile connections; attached to a report by upload_id
+upload_sessions = UploadSessions(db[UPLOAD_SESSIONS_COLLECTION], app.config['UPLOAD_FOLDER'], uploads_collection)
+upload_sessions.start_reaper()
+
+# Resized WebP variants of report images, made off the request path (see thumbnails.py)
+thumbnails = ThumbnailPipeline(app.config['UPLOAD_FOLDER'], issues_collection, uploads_collection, workers=2,
+                               on_recorded=lambda category: invalidate_issue_caches(category=category))
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -41,9 +93,13 @@ def register():
         return jsonify({'error': 'Missing required fields'}), 400
     if users_collection.find_one({'email': email}):
         return jsonify({'error': 'User already exists'}), 400
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = password_hasher.hash(password)
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
     user_data = {'name': name, 'email': email, 'password': hashed_password, 'role': 'user', 'created_at': datetime.utcnow()}
     result = users_collection.insert_one(user_data)
+    user_cache.invalidate(result.inserted_id)
     access_token = create_access_token(identity=str(result.inserted_id))
     return jsonify({'message': 'User registered successfully','access_token': access_token,'user': {'id': str(result.inserted_id),'name': name,'email': email,'role': 'user'}}), 201
 
@@ -55,25 +111,59 @@ def login():
     password = data.get('password')
     if not email or not password:
         return jsonify({'error': 'Missing email or password'}), 400
-    user = users_collection.find_one({'email': email})
-    if not user or not check_password_hash(user['password'], password):
+    try:
+        user = authenticate(users_collection, password_hasher, email, password)
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503
+    if not user:
         return jsonify({'error': 'Invalid credentials'}), 401
     access_token = create_access_token(identity=str(user['_id']))
     return jsonify({'message': 'Login successful','access_token': access_token,'user': {'id': str(user['_id']),'name': user['name'],'email': user['email'],'role': user['role']}}), 200
 
 
+@app.route('/upload-sessions', methods=['POST'])
+@jwt_required()
+def create_upload_session():
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(upload_sessions.create(get_jwt_identity(), data.get('size'))), 201
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@app.route('/upload-sessions/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload_session(upload_id):
+    try:
+        return jsonify(upload_sessions.status(upload_id, get_jwt_identity())), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@app.route('/upload-sessions/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id, index):
+    try:
+        state = upload_sessions.write_chunk(upload_id, get_jwt_identity(), index,
+                                            request.stream, request.content_length)
+        return jsonify(state), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@app.route('/upload-sessions/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload_session(upload_id):
+    try:
+        return jsonify(upload_sessions.complete(upload_id, get_jwt_identity())), 200
+    except UploadError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
 @app.route('/report', methods=['POST'])
 @jwt_required()
 def submit_report():
     user_id = get_jwt_identity()
-    image_filename = None
-    if 'image' in request.files:
-        file = request.files['image']
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-            image_filename = unique_filename
     title = request.form.get('title')
     description = request.form.get('description')
     category = request.form.get('category')
@@ -82,10 +172,37 @@ def submit_report():
     address = request.form.get('address')
     if not title or not description or not category:
         return jsonify({'error': 'Missing required fields'}), 400
-    issue_data = {'user_id': user_id,'title': title,'description': description,'category': category,'status': 'Pending','image': image_filename,'location': {'latitude': float(latitude) if latitude else None,'longitude': float(longitude) if longitude else None,'address': address},'created_at': datetime.utcnow(),'updated_at': datetime.utcnow()}
+    image_filename = None
+    image_meta = None
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        try:
+            image_meta = upload_sessions.attach(upload_id, user_id)
+        except UploadError as e:
+            return jsonify(e.to_dict()), e.status_code
+        image_filename = image_meta['filename']
+    elif 'image' in request.files:
+        file = request.files['image']
+        if file and allowed_file(file.filename):
+            try:
+                image_meta = store_upload(file, app.config['UPLOAD_FOLDER'], uploads_collection)
+            except UploadError as e:
+                return jsonify({'error': e.message}), e.status_code
+            image_filename = image_meta['filename']
+    issue_data = {'user_id': user_id,'title': title,'description': description,'category': category,'status': 'Pending','image': image_filename,'image_meta': image_meta,'location': {'latitude': float(latitude) if latitude else None,'longitude': float(longitude) if longitude else None,'address': address,'address_prefixes': address_prefixes(address)},'created_at': datetime.utcnow(),'updated_at': datetime.utcnow()}
+    point = make_point(latitude, longitude)
+    if point:
+        issue_data['location']['point'] = point
     result = issues_collection.insert_one(issue_data)
-    user = users_collection.find_one({'_id': ObjectId(user_id)})
-    socketio.emit('notification', {'title': 'New Issue Reported','message': f"New issue reported by {user['name']}: {title}",'type': 'new_issue','issue_id': str(result.inserted_id),'status': 'Pending','created_at': issue_data['created_at'].isoformat()}, room='admins')
+    record_new_issue(stats_collection, category)
+    invalidate_issue_caches(category=category, statuses=('Pending',))
+    if image_filename:
+        try:
+            thumbnails.submit(image_filename, category)
+        except Exception as e:
+            print(f"Failed to queue thumbnails for {image_filename}: {e}")
+    user = user_cache.get(user_id)
+    realtime.new_issue({**issue_data, '_id': result.inserted_id}, user['name'])
     return jsonify({'message': 'Issue reported successfully','issue_id': str(result.inserted_id)}), 201
 
 
@@ -93,31 +210,97 @@ def submit_report():
 @jwt_required()
 def get_my_reports():
     user_id = get_jwt_identity()
-    issues = list(issues_collection.find({'user_id': user_id}).sort('created_at', -1))
-    for issue in issues:
-        issue['_id'] = str(issue['_id'])
-        issue['created_at'] = issue['created_at'].isoformat()
-        issue['updated_at'] = issue['updated_at'].isoformat()
-    return jsonify({'issues': issues}), 200
+    try:
+        limit, cursor = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    issues, next_cursor = list_issues(issues_collection, user_cache, {'user_id': user_id},
+                                      with_reporter=False, limit=limit, cursor=cursor)
+    return jsonify({'issues': issues, 'next_cursor': next_cursor}), 200
 
 
 @app.route('/issues', methods=['GET'])
 def get_all_issues():
     category = request.args.get('category')
     status = request.args.get('status')
+    try:
+        limit, cursor = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    cache_key = (category or None, status or None, limit, request.args.get('cursor'))
+    entry = issues_cache.get(cache_key)
+    if entry is None:
+        generation = issues_cache.generation
+        query = {}
+        if category:
+            query['category'] = category
+        if status:
+            query['status'] = status
+        issues, next_cursor = list_issues(issues_collection, user_cache, query, limit=limit, cursor=cursor)
+        entry = issues_cache.store(cache_key, app.json.dumps({'issues': issues, 'next_cursor': next_cursor}), generation)
+    return conditional_json_response(entry)
+
+
+@app.route('/issues/stats', methods=['GET'])
+def get_issue_stats():
+    stats = read_stats(stats_collection, category=request.args.get('category'))
+    return jsonify({'total': stats['total'], 'by_status': stats['by_status']}), 200
+
+
+@app.route('/issues/nearby', methods=['GET'])
+def get_nearby_issues():
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lng'])
+        radius = min(float(request.args.get('radius', '1000')), MAX_RADIUS_METERS)
+        limit = parse_map_limit(request.args.get('limit'))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required; radius and limit must be numbers'}), 400
+    query = {}
+    if request.args.get('category'):
+        query['category'] = request.args['category']
+    if request.args.get('status'):
+        query['status'] = request.args['status']
+    issues = find_nearby(issues_collection, query, latitude, longitude, radius, limit)
+    return jsonify({'issues': present_issues(issues, user_cache)}), 200
+
+
+@app.route('/issues/within', methods=['GET'])
+def get_issues_within():
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+        limit = parse_map_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    query = {}
+    if request.args.get('category'):
+        query['category'] = request.args['category']
+    if request.args.get('status'):
+        query['status'] = request.args['status']
+    issues = find_within(issues_collection, query, bbox, limit)
+    return jsonify({'issues': present_issues(issues, user_cache), 'truncated': len(issues) == limit}), 200
+
+
+@app.route('/issues/clusters', methods=['GET'])
+def get_issue_clusters():
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+        zoom = parse_zoom(request.args.get('zoom'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    category = request.args.get('category') or None
+    status = request.args.get('status') or None
     query = {}
     if category:
         query['category'] = category
     if status:
         query['status'] = status
-    issues = list(issues_collection.find(query).sort('created_at', -1))
-    for issue in issues:
-        user = users_collection.find_one({'_id': ObjectId(issue['user_id'])})
-        issue['user_name'] = user['name'] if user else 'Unknown'
-        issue['_id'] = str(issue['_id'])
-        issue['created_at'] = issue['created_at'].isoformat()
-        issue['updated_at'] = issue['updated_at'].isoformat()
-    return jsonify({'issues': issues}), 200
+    try:
+        clusters = cluster_issues(issues_collection, query, bbox, zoom,
+                                  tile_cache=cluster_cache, filter_key=(category, status))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'zoom': zoom, 'clusters': clusters}), 200
 
 
 @app.route('/notifications', methods=['GET'])
@@ -157,28 +340,66 @@ def internal_emit_user_notification():
     payload = data.get('payload', {})
     if not user_id or not title or not message:
         return jsonify({'error': 'Missing fields'}), 400
-    socketio.emit('notification', { 'title': title, 'message': message, **payload }, room=f'user_{user_id}')
+    # Status changes made by the admin service invalidate this process's /issues cache
+    if data.get('category'):
+        invalidate_issue_caches(category=data['category'])
+    realtime.emit('notification', {'title': title, 'message': message, **payload}, [user_room(user_id)])
     return jsonify({'emitted': True}), 200
 
 
+# Batched form used by admin_app's notification bridge: {'events': [{user_id, title, message, payload, category}]}
+@app.route('/internal/emit_batch', methods=['POST'])
+def internal_emit_batch():
+    events = (request.get_json() or {}).get('events')
+    if not isinstance(events, list):
+        return jsonify({'error': 'events must be a list'}), 400
+    emitted = 0
+    categories = set()
+    for event in events:
+        if not isinstance(event, dict) or not event.get('user_id') or not event.get('title') or not event.get('message'):
+            continue
+        if event.get('category'):
+            categories.add(event['category'])
+        realtime.emit('notification', {'title': event['title'], 'message': event['message'], **event.get('payload', {})},
+                      [user_room(event['user_id'])])
+        emitted += 1
+    # One invalidation per category, not per event
+    for category in categories:
+        invalidate_issue_caches(category=category)
+    return jsonify({'emitted': emitted, 'skipped': len(events) - emitted}), 200
+
+
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    # Only the rooms the JWT grants; join_room accepts nothing else from this socket
+    session['rooms'] = rooms_for_token((auth or {}).get('token'), revocations)
+    for room in session['rooms']:
+        join_room(room)
     emit('connected', {'message': 'Connected to user server'})
 
 
 @socketio.on('join_room')
 def handle_join_room(data):
-    room = data['room']
+    room = (data or {}).get('room')
+    if room not in session.get('rooms', []):
+        emit('join_refused', {'room': room, 'error': 'Not allowed to join this room'})
+        return
     join_room(room)
     emit('joined_room', {'room': room})
 
 
-@app.route('/uploads/<filename>')
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Upload is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB'}), 413
+
+
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(app.config['UPLOAD_FOLDER'], filename)
 
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # No reloader: its parent process would start a second set of background workers
+    socketio.run(app, debug=True, use_reloader=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
 
 
@@ -10,6 +10,7 @@ interface ReportCardProps {
     category: string
     status: string
     image?: string
+    thumbnail?: string
     location?: {
       address?: string
       latitude?: number
@@ -68,7 +69,7 @@ export function ReportCard({ report, showUserName = false }: ReportCardProps) {
           </div>
           {report.image && (
             <img
-              src={`http://localhost:5000/uploads/${report.image}`}
+              src={`http://localhost:5000/uploads/${report.thumbnail ?? report.image}`}
               alt="Issue"
               className="w-16 h-16 object-cover rounded-lg ml-4"
             />
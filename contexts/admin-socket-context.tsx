@@ -18,7 +18,11 @@ export function AdminSocketProvider({ children }: { children: ReactNode }) {
 
   useEffect(() => {
     if (user) {
-      const s = io("http://localhost:5000", { transports: ["websocket"], autoConnect: true })
+      const s = io("http://localhost:5000", {
+        transports: ["websocket"],
+        autoConnect: true,
+        auth: { token: localStorage.getItem("token_admin") },
+      })
       s.on("connect", () => {
         setIsConnected(true)
         s.emit("join_room", { room: "admins" })
@@ -26,6 +26,8 @@ export function SocketProvider({ children }: { children: ReactNode }) {
       const newSocket = io("http://localhost:5000", {
         transports: ["websocket"],
         autoConnect: true,
+        // The server places authenticated sockets in their user/admin rooms
+        auth: { token: localStorage.getItem("token_user") },
       })
 
       // Connection event handlers
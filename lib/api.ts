@@ -54,12 +54,12 @@ class ApiClient {
     return result
   }
 
-  async get<T>(endpoint: string, params?: Record<string, string>, base: "user" | "admin" | "staff" = "user"): Promise<T> {
+  async get<T>(endpoint: string, params?: Record<string, string | undefined>, base: "user" | "admin" | "staff" = "user"): Promise<T> {
     const baseUrl = base === "admin" ? ADMIN_API_BASE_URL : API_BASE_URL
     const url = new URL(`${baseUrl}${endpoint}`)
     if (params) {
       Object.entries(params).forEach(([key, value]) => {
-        url.searchParams.append(key, value)
+        if (value !== undefined) url.searchParams.append(key, value)
       })
     }
 
@@ -111,6 +111,60 @@ class ApiClient {
 
 export const api = new ApiClient()
 
+interface UploadSession {
+  upload_id: string
+  size: number
+  chunk_size: number
+  offset: number
+  complete: boolean
+}
+
+// Sends an image in chunks and, after a dropped request, resumes from the offset the server has.
+// Returns the upload_id to send with /report instead of the file.
+export async function uploadImageResumable(file: File, maxRetries = 5): Promise<string> {
+  const session = await api.post<UploadSession>("/upload-sessions", { size: file.size })
+  let offset = session.offset
+  let failures = 0
+
+  while (offset < file.size) {
+    const index = Math.floor(offset / session.chunk_size)
+    const start = index * session.chunk_size
+    const chunk = file.slice(start, Math.min(start + session.chunk_size, file.size))
+    try {
+      const token = localStorage.getItem("token_user")
+      const response = await fetch(`${API_BASE_URL}/upload-sessions/${session.upload_id}/chunks/${index}`, {
+        method: "PUT",
+        headers: {
+          "Content-Type": "application/octet-stream",
+          ...(token && { Authorization: `Bearer ${token}` }),
+        },
+        body: chunk,
+      })
+      const result = await response.json()
+      // 409 means the server expects another chunk; it says which offset to continue from
+      if (response.ok || (response.status === 409 && typeof result.offset === "number")) {
+        offset = result.offset
+        failures = 0
+        continue
+      }
+      throw new Error(result.error || "Image upload failed")
+    } catch (err) {
+      failures += 1
+      if (failures > maxRetries) {
+        throw err
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** (failures - 1)))
+      offset = await api
+        .get<UploadSession>(`/upload-sessions/${session.upload_id}`)
+        .then((state) => state.offset)
+        .catch(() => offset)
+    }
+  }
+
+  await api.post<UploadSession>(`/upload-sessions/${session.upload_id}/complete`, {})
+  return session.upload_id
+}
+
 // Auth API functions
 export const authApi = {
   register: (data: { name: string; email: string; password: string }) => api.post<AuthResponse>("/register", data),
@@ -118,16 +172,52 @@ export const authApi = {
   login: (data: { email: string; password: string }) => api.post<AuthResponse>("/login", data),
 }
 
+// Listings come in pages; pass a page's next_cursor back as `cursor` for the next one (null on the last page)
+export interface IssuePage {
+  issues: any[]
+  next_cursor: string | null
+}
+
+type PageParams = { cursor?: string; limit?: string }
+
 // Issues API functions
 export const issuesApi = {
   submitReport: (formData: FormData) => api.postFormData<{ message: string; issue_id: string }>("/report", formData),
 
-  getMyReports: () => api.get<{ issues: any[] }>("/myreports"),
+  getMyReports: (params?: PageParams) => api.get<IssuePage>("/myreports", params),
+
+  // Every page of the signed-in user's own reports
+  getAllMyReports: async () => {
+    const issues: any[] = []
+    let cursor: string | undefined
+    do {
+      const page = await issuesApi.getMyReports({ cursor, limit: "200" })
+      issues.push(...page.issues)
+      cursor = page.next_cursor ?? undefined
+    } while (cursor)
+    return issues
+  },
+
+  getAllIssues: (params?: { category?: string; status?: string } & PageParams) => api.get<IssuePage>("/issues", params),
+
+  getIssueStats: (params?: { category?: string }) =>
+    api.get<{ total: number; by_status: Record<string, number> }>("/issues/stats", params),
+
+  // Map viewport queries; bbox is "minLng,minLat,maxLng,maxLat"
+  getIssuesWithin: (params: { bbox: string; category?: string; status?: string; limit?: string }) =>
+    api.get<{ issues: any[]; truncated: boolean }>("/issues/within", params),
+
+  getIssueClusters: (params: { bbox: string; zoom: string; category?: string; status?: string }) =>
+    api.get<{ zoom: number; clusters: { lat: number; lng: number; count: number; statuses: Record<string, number> }[] }>(
+      "/issues/clusters",
+      params,
+    ),
 
-  getAllIssues: (params?: { category?: string; status?: string }) => api.get<{ issues: any[] }>("/issues", params),
+  getNearbyIssues: (params: { lat: string; lng: string; radius?: string; category?: string; status?: string }) =>
+    api.get<{ issues: any[] }>("/issues/nearby", params),
 
-  getAdminReports: (params?: { category?: string; status?: string; location?: string }) =>
-    api.get<{ issues: any[] }>("/admin/reports", params, "admin"),
+  getAdminReports: (params?: { category?: string; status?: string; location?: string } & PageParams) =>
+    api.get<IssuePage>("/admin/reports", params, "admin"),
 
   updateIssueStatus: (data: { issue_id: string; status: string }) =>
     api.post<{ message: string }>("/admin/update", data, "admin"),
@@ -156,16 +246,28 @@ export const notificationsApi = {
 export const staffApi = {
   login: (email: string, password: string) =>
     api.post<AuthResponse>("/staff/login", { email, password }, "staff"),
-  getReports: () => api.get<any>("/staff/reports", undefined, "staff"),
+  getReports: (params?: PageParams) => api.get<IssuePage & { category: string }>("/staff/reports", params, "staff"),
+  getStats: () =>
+    api.get<{ category: string; total: number; by_status: Record<string, number> }>("/staff/stats", undefined, "staff"),
   updateStatus: (id: string, status: string) =>
     api.put<any>(`/staff/reports/${id}/status`, { status }, "staff"),
+  bulkUpdateStatus: (issueIds: string[], status: string) =>
+    api.post<{ updated: number; skipped: string[] }>("/staff/bulk-update", { issue_ids: issueIds, status }, "staff"),
 }
 
 // Admin API functions
 export const adminApi = {
   login: (email: string, password: string) =>
     api.post<AuthResponse>("/admin/login", { email, password }, "admin"),
-  getReports: () => api.get<any>("/admin/reports", undefined, "admin"),
+  getReports: (params?: PageParams) => api.get<IssuePage>("/admin/reports", params, "admin"),
+  getStats: () =>
+    api.get<{
+      total: number
+      by_status: Record<string, number>
+      by_category: Record<string, { total: number; statuses: Record<string, number> }>
+    }>("/admin/stats", undefined, "admin"),
   updateStatus: (id: string, status: string) =>
     api.put<any>(`/admin/reports/${id}/status`, { status }, "admin"),
+  bulkUpdateStatus: (issueIds: string[], status: string) =>
+    api.post<{ updated: number; skipped: string[] }>("/admin/bulk-update", { issue_ids: issueIds, status }, "admin"),
 }